@@ -0,0 +1,106 @@
+"""Compare per-event webhook rendering with compiled templates against the original per-string compile.
+
+Run from ``common_custom/``::
+
+    uv run python -m benchmarks.webhook_render
+
+Every template under ``webhook-templates/`` is rendered with a sample context of
+its event. ``legacy`` builds a ``jinja2.Template`` for every string on every
+event, as ``WebhookValidator.render_recursive`` used to. ``compiled`` renders a
+``CompiledWebhook`` built once, as the registry and the delivery workers do, and
+``compile`` is that one-off cost.
+"""
+import os
+import json
+import time
+import statistics
+from pathlib import Path
+
+# Keep logging out of the timings; must be set before common_custom is imported.
+os.environ.setdefault("LOGGER_LEVEL", "WARNING")
+
+from jinja2 import Template  # noqa: E402
+from common_custom.utils.pydantic.webhook_models import HTTPRequest, CompiledWebhook  # noqa: E402
+
+TEMPLATES_DIR = Path(__file__).resolve().parents[2] / "webhook-templates"
+REPEAT = 2_000
+
+BASE_CONTEXT = {
+    "owner_name": "Owner",
+    "owner_email": "owner@example.com",
+    "owner_phone_number": "+15550100",
+    "nl": "\n",
+    "newline": "\n",
+    "date": "2026-01-01",
+    "time": "12:00",
+    "time_seconds": "12:00:00",
+    "name": "Guest",
+    "phone_number": "+15550199",
+    "email": "guest@example.com",
+}
+
+EVENT_CONTEXT = {
+    "pending.new": {"ip_address": "203.0.113.7", "service": "grafana.example.com", "note": "Please"},
+    "pending.accepted": {"service": "grafana.example.com", "expiry_date": "2026-01-02", "expiry_time": "12:00", "expiry_time_seconds": "12:00:00"},
+    "pending.denied": {"service": "grafana.example.com"},
+    "connection.revoked": {"service": "grafana.example.com"},
+}
+
+
+def legacy_render_recursive(data, context: dict):
+    """The pre-registry renderer: a new Template for every string, every event."""
+    if isinstance(data, str):
+        return Template(data).render(**context)
+    if isinstance(data, dict):
+        return {k: legacy_render_recursive(v, context) for k, v in data.items()}
+    if isinstance(data, list):
+        return [legacy_render_recursive(item, context) for item in data]
+    return data
+
+
+def legacy_render(request: HTTPRequest, context: dict) -> dict:
+    return {
+        "url": legacy_render_recursive(request.url, context),
+        "headers": legacy_render_recursive(request.headers or {}, context),
+        "params": legacy_render_recursive(request.query_params or {}, context),
+        "cookies": legacy_render_recursive(request.cookies or {}, context),
+        "json": legacy_render_recursive(request.body or {}, context),
+    }
+
+
+def per_call(func, repeat: int) -> float:
+    """Median seconds per call over 5 batches of `repeat` calls."""
+
+    samples = []
+
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        samples.append((time.perf_counter() - started) / repeat)
+
+    return statistics.median(samples)
+
+
+def main() -> None:
+
+    print(f"{'template':<45} {'legacy µs':>10} {'compiled µs':>12} {'compile µs':>11} {'speedup':>8}")
+
+    for path in sorted(TEMPLATES_DIR.glob("*/*.json")):
+
+        request = HTTPRequest(**json.loads(path.read_text(encoding="utf-8")))
+        context = {**BASE_CONTEXT, **EVENT_CONTEXT[request.event]}
+
+        compiled = CompiledWebhook(request)
+        assert compiled.render(context) == legacy_render(request, context), path
+
+        legacy = per_call(lambda: legacy_render(request, context), REPEAT // 10)
+        rendered = per_call(lambda: compiled.render(context), REPEAT)
+        compile_once = per_call(lambda: CompiledWebhook(request), REPEAT // 10)
+
+        name = f"{path.parent.name}/{request.event}"
+        print(f"{name:<45} {legacy * 1e6:>10.1f} {rendered * 1e6:>12.1f} {compile_once * 1e6:>11.1f} {legacy / rendered:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
+import os
 import json
 import sqlite3
 import secrets
 import threading
 from pathlib import Path
+from contextlib import contextmanager
 from typing import Literal
+from dotenv import load_dotenv
 from fastapi import HTTPException
 from datetime import datetime, timedelta, timezone
 from common_custom.controllers.validators import MongoID
@@ -17,6 +20,10 @@ from common_custom.controllers.pydantic.service_models import ServiceResponseMod
 from common_custom.controllers.pydantic.allowed_models import AllowedConnectionModel, DeniedConnectionModel
 from common_custom.utils.pydantic.webhook_models import HTTPRequest
 
+DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
+
+load_dotenv(DATA_DIR / ".env")
+
 
 def _client_ip_query_variants(ip_str: str) -> list[str]:
     """Match a stored `ip_address` whether saved as e.g. `127.0.0.1` or `::ffff:127.0.0.1`."""
@@ -80,15 +87,20 @@ class Database:
         self.db_path: str = db_path
         self.connection: sqlite3.Connection = None
         self._lock = threading.Lock()
+        self._local_writes = 0
 
         self.services_collection_name = "services"
         self.pending_collection_name = "pending_connections"
         self.allowed_collection_name = "allowed_connections"
         self.ignored_collection_name = "ignored_collection"
         self.webhooks_collection_name = "webhooks"
+        self.webhook_outbox_collection_name = "webhook_outbox"
 
     def connect(self) -> sqlite3.Connection:
 
+        if self.connection is not None:
+            return self.connection
+
         if not self.db_path:
             raise ValueError("No database path was specified during the connection.")
 
@@ -109,9 +121,44 @@ class Database:
 
         return connection
 
-    def _create_tables(self):
+    def close(self) -> None:
+        """Close the connection; a later `connect()` opens a new one."""
         with self._lock:
-            self.connection.executescript(
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+                # `PRAGMA data_version` restarts on a new connection; this keeps cache tokens from repeating.
+                self._local_writes += 1
+
+    @contextmanager
+    def _schema_transaction(self):
+        """
+        Hold SQLite's write lock for the whole schema setup. Workers starting together
+        on one file take turns: the first creates or migrates the schema while the others
+        wait (busy_timeout), then find it in place. Caller holds the lock.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
+    def _execute_script(self, script: str):
+        """Run `script` one statement at a time; unlike `executescript`, this keeps the open transaction."""
+        statement = ""
+        for line in script.splitlines(keepends=True):
+            statement += line
+            if sqlite3.complete_statement(statement):
+                self.connection.execute(statement)
+                statement = ""
+
+    def _create_tables(self):
+        with self._lock, self._schema_transaction():
+            legacy_webhooks = self._detach_single_event_webhooks()
+
+            self._execute_script(
                 """
                 CREATE TABLE IF NOT EXISTS services (
                     id TEXT PRIMARY KEY,
@@ -130,7 +177,8 @@ class Database:
                     contact_methods TEXT,
                     service TEXT,
                     location TEXT,
-                    notes TEXT
+                    notes TEXT,
+                    geo TEXT
                 );
 
                 CREATE TABLE IF NOT EXISTS allowed_connections (
@@ -138,7 +186,8 @@ class Database:
                     ip_address TEXT,
                     service_name TEXT,
                     contact_methods TEXT,
-                    ExpireAt TEXT
+                    ExpireAt TEXT,
+                    geo TEXT
                 );
 
                 CREATE TABLE IF NOT EXISTS ignored_collection (
@@ -148,19 +197,136 @@ class Database:
                     contact_methods TEXT
                 );
 
+                CREATE TABLE IF NOT EXISTS revisions (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+
+                INSERT OR IGNORE INTO revisions (name, value) VALUES ('services', 0);
+                INSERT OR IGNORE INTO revisions (name, value) VALUES ('webhooks', 0);
+                INSERT OR IGNORE INTO revisions (name, value) VALUES ('grants', 0);
+
+                CREATE TRIGGER IF NOT EXISTS services_revision_insert AFTER INSERT ON services
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'services'; END;
+
+                CREATE TRIGGER IF NOT EXISTS services_revision_update AFTER UPDATE ON services
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'services'; END;
+
+                CREATE TRIGGER IF NOT EXISTS services_revision_delete AFTER DELETE ON services
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'services'; END;
+
+                CREATE TRIGGER IF NOT EXISTS grants_revision_insert AFTER INSERT ON allowed_connections
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'grants'; END;
+
+                CREATE TRIGGER IF NOT EXISTS grants_revision_update AFTER UPDATE ON allowed_connections
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'grants'; END;
+
+                CREATE TRIGGER IF NOT EXISTS grants_revision_delete AFTER DELETE ON allowed_connections
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'grants'; END;
+
                 CREATE TABLE IF NOT EXISTS webhooks (
                     id TEXT PRIMARY KEY,
-                    event TEXT NOT NULL UNIQUE,
+                    event TEXT NOT NULL,
+                    name TEXT,
+                    enabled INTEGER NOT NULL DEFAULT 1,
+                    services TEXT,
+                    categories TEXT,
                     method TEXT,
                     url TEXT,
                     headers TEXT,
                     query_params TEXT,
                     cookies TEXT,
-                    body TEXT
+                    body TEXT,
+                    digest_seconds INTEGER,
+                    digest_max_batch INTEGER
                 );
+
+                CREATE INDEX IF NOT EXISTS webhooks_event ON webhooks (event);
+
+                CREATE TRIGGER IF NOT EXISTS webhooks_revision_insert AFTER INSERT ON webhooks
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'webhooks'; END;
+
+                CREATE TRIGGER IF NOT EXISTS webhooks_revision_update AFTER UPDATE ON webhooks
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'webhooks'; END;
+
+                CREATE TRIGGER IF NOT EXISTS webhooks_revision_delete AFTER DELETE ON webhooks
+                BEGIN UPDATE revisions SET value = value + 1 WHERE name = 'webhooks'; END;
+
+                CREATE TABLE IF NOT EXISTS webhook_outbox (
+                    id TEXT PRIMARY KEY,
+                    event TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    context TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TEXT NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    batch_key TEXT,
+                    batch_size INTEGER NOT NULL DEFAULT 1
+                );
+
+                CREATE INDEX IF NOT EXISTS webhook_outbox_due ON webhook_outbox (status, next_attempt_at);
                 """
             )
-            self.connection.commit()
+
+            # Columns added after a table was first shipped; CREATE TABLE IF NOT EXISTS leaves old tables alone.
+            self._add_missing_columns("pending_connections", {"geo": "TEXT"})
+            self._add_missing_columns("allowed_connections", {"geo": "TEXT"})
+            self._add_missing_columns("webhooks", {
+                "name": "TEXT",
+                "enabled": "INTEGER NOT NULL DEFAULT 1",
+                "services": "TEXT",
+                "categories": "TEXT",
+                "digest_seconds": "INTEGER",
+                "digest_max_batch": "INTEGER",
+            })
+            self._add_missing_columns("webhook_outbox", {
+                "batch_key": "TEXT",
+                "batch_size": "INTEGER NOT NULL DEFAULT 1",
+            })
+
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS webhook_outbox_batch ON webhook_outbox (batch_key, status)"
+            )
+
+            if legacy_webhooks:
+                self._restore_legacy_webhooks()
+
+    def _detach_single_event_webhooks(self) -> bool:
+        """
+        Move a `webhooks` table from before multiple webhooks per event (`event ... UNIQUE`)
+        out of the way so it can be recreated; `_restore_legacy_webhooks` copies its rows back.
+        Caller holds the lock.
+        """
+        row = self.connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'webhooks'"
+        ).fetchone()
+
+        if row is None or "UNIQUE" not in row["sql"].upper():
+            return False
+
+        # Renaming would carry the revision triggers along; they are recreated on the new table.
+        for action in ("insert", "update", "delete"):
+            self.connection.execute(f"DROP TRIGGER IF EXISTS webhooks_revision_{action}")
+
+        self.connection.execute("ALTER TABLE webhooks RENAME TO webhooks_legacy")
+        return True
+
+    def _restore_legacy_webhooks(self):
+        legacy_columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(webhooks_legacy)")}
+        current_columns = [row["name"] for row in self.connection.execute("PRAGMA table_info(webhooks)")]
+        columns = ", ".join(column for column in current_columns if column in legacy_columns)
+
+        self.connection.execute(f"INSERT INTO webhooks ({columns}) SELECT {columns} FROM webhooks_legacy")
+        self.connection.execute("DROP TABLE webhooks_legacy")
+
+    def _add_missing_columns(self, table_name: str, columns: dict[str, str]):
+        """Add each `name: declaration` column that `table_name` lacks. Caller holds the lock."""
+        existing = {row["name"] for row in self.connection.execute(f"PRAGMA table_info({table_name})")}
+        for name, declaration in columns.items():
+            if name not in existing:
+                self.connection.execute(f"ALTER TABLE {table_name} ADD COLUMN {name} {declaration}")
 
     def _purge_expired_allowed(self):
         """Mimic MongoDB's TTL index by deleting expired allowed connections."""
@@ -174,8 +340,36 @@ class Database:
         with self._lock:
             cursor = self.connection.execute(sql, params)
             self.connection.commit()
+            self._local_writes += 1
             return cursor
 
+    def data_version(self) -> tuple[int, int]:
+        """Cheap change token for in-memory caches.
+
+        `PRAGMA data_version` changes when another connection (including other
+        processes) commits; the local write counter covers commits made through
+        this connection, which `data_version` does not report.
+        """
+        with self._lock:
+            version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            return version, self._local_writes
+
+    def _revision(self, name: str) -> int:
+        row = self._fetchone("SELECT value FROM revisions WHERE name = ?", (name,))
+        return row["value"] if row is not None else 0
+
+    def services_revision(self) -> int:
+        """Counter bumped by triggers on every insert, update or delete in `services`, from any process."""
+        return self._revision("services")
+
+    def webhooks_revision(self) -> int:
+        """Counter bumped by triggers on every insert, update or delete in `webhooks`, from any process."""
+        return self._revision("webhooks")
+
+    def grants_revision(self) -> int:
+        """Counter bumped by triggers on every insert, update or delete in `allowed_connections`, from any process."""
+        return self._revision("grants")
+
     def _fetchone(self, sql: str, params: tuple = ()):
         with self._lock:
             return self.connection.execute(sql, params).fetchone()
@@ -206,6 +400,7 @@ class Database:
                 "ip_address": row["ip_address"],
                 "service": _load_json(row["service"]),
                 "location": _load_json(row["location"]),
+                "geo": _load_json(row["geo"]),
                 "notes": row["notes"],
             }
 
@@ -216,6 +411,7 @@ class Database:
                 "contact_methods": _load_json(row["contact_methods"]),
                 "service_name": row["service_name"],
                 "ExpireAt": _from_iso(row["ExpireAt"]),
+                "geo": _load_json(row["geo"]),
             }
 
         if table_name == self.ignored_collection_name:
@@ -230,12 +426,32 @@ class Database:
             return {
                 "_id": row["id"],
                 "event": row["event"],
+                "name": row["name"],
+                "enabled": bool(row["enabled"]),
+                "services": _load_json(row["services"]),
+                "categories": _load_json(row["categories"]),
                 "method": row["method"],
                 "url": row["url"],
                 "headers": _load_json(row["headers"]),
                 "query_params": _load_json(row["query_params"]),
                 "cookies": _load_json(row["cookies"]),
                 "body": _load_json(row["body"]),
+                "digest_seconds": row["digest_seconds"],
+                "digest_max_batch": row["digest_max_batch"],
+            }
+
+        if table_name == self.webhook_outbox_collection_name:
+            return {
+                "_id": row["id"],
+                "event": row["event"],
+                "request": _load_json(row["request"]),
+                "context": _load_json(row["context"]),
+                "batch_size": row["batch_size"],
+                "status": row["status"],
+                "attempts": row["attempts"],
+                "next_attempt_at": _from_iso(row["next_attempt_at"]),
+                "last_error": row["last_error"],
+                "created_at": _from_iso(row["created_at"]),
             }
 
         return {key: row[key] for key in row.keys()}
@@ -248,6 +464,7 @@ class Database:
         additional_notes,
         request_latitude,
         request_longitude,
+        geo: dict | None = None,
     ) -> PendingConnectionDatabaseModel:
 
         document_payload = PendingConnectionDatabaseModel(
@@ -256,6 +473,7 @@ class Database:
             service=service,
             notes=additional_notes,
             location=LocationRequestModel(lat=request_latitude, lon=request_longitude),
+            geo=geo,
         )
 
         validated_document = document_payload.model_dump(mode="json", exclude={"id"})
@@ -266,8 +484,8 @@ class Database:
         self._execute(
             """
             INSERT INTO pending_connections
-                (id, ip_address, service_name, contact_methods, service, location, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+                (id, ip_address, service_name, contact_methods, service, location, notes, geo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 document_id,
@@ -277,6 +495,7 @@ class Database:
                 _dump_json(validated_document.get("service")),
                 _dump_json(validated_document.get("location")),
                 validated_document.get("notes"),
+                _dump_json(validated_document.get("geo")),
             ),
         )
 
@@ -287,6 +506,23 @@ class Database:
         rows = self._fetchall("SELECT * FROM services")
         return [self._row_to_doc(row, self.services_collection_name) for row in rows]
 
+    async def list_active_grants(self) -> list[dict]:
+        """Return `ip_address`, `service_name` and `ExpireAt` of every non-expired allowed connection."""
+        now_iso = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+        rows = self._fetchall(
+            "SELECT ip_address, service_name, ExpireAt FROM allowed_connections "
+            "WHERE ExpireAt IS NULL OR ExpireAt > ?",
+            (now_iso,),
+        )
+        return [
+            {
+                "ip_address": row["ip_address"],
+                "service_name": row["service_name"],
+                "ExpireAt": _from_iso(row["ExpireAt"]),
+            }
+            for row in rows
+        ]
+
     async def list_service_names(self) -> list[str]:
         rows = self._fetchall("SELECT DISTINCT name FROM services")
         return [row["name"] for row in rows]
@@ -434,8 +670,8 @@ class Database:
         document_id = _generate_id()
         self._execute(
             """
-            INSERT INTO allowed_connections (id, ip_address, service_name, contact_methods, ExpireAt)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO allowed_connections (id, ip_address, service_name, contact_methods, ExpireAt, geo)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
             (
                 document_id,
@@ -443,6 +679,7 @@ class Database:
                 payload.service_name,
                 _dump_json(payload.contact_methods.model_dump(mode="json")),
                 _to_iso(payload.ExpireAt),
+                _dump_json(payload.geo.model_dump(mode="json")) if payload.geo else None,
             ),
         )
         return document_id
@@ -531,6 +768,7 @@ class Database:
             ip_address=pending_connection_payload.get("ip_address"),
             service_name=service_name,
             ExpireAt=connection_expiry,
+            geo=pending_connection_payload.get("geo"),
         )
 
         self._insert_allowed_row(allowed_connection_payload)
@@ -545,6 +783,7 @@ class Database:
         contact_methods: ContactMethodsModel,
         expiry_minutes: int | None,
         expire_at: datetime | None = None,
+        geo: dict | None = None,
     ) -> AllowedConnectionModel:
 
         if not await self.get_service(service_name):
@@ -573,6 +812,7 @@ class Database:
             ip_address=ip_address,
             service_name=service_name,
             ExpireAt=connection_expiry,
+            geo=geo,
         )
 
         document_id = self._insert_allowed_row(allowed_connection_payload)
@@ -692,39 +932,56 @@ class Database:
 
         return deleted_document
 
-    async def get_webhook(self, event: str):
-        row = self._fetchone("SELECT * FROM webhooks WHERE event = ?", (event,))
+    async def list_webhooks(self, event: str | None = None) -> list[dict]:
+        """Every webhook, or those of `event`, in creation order within each event."""
+        if event is None:
+            rows = self._fetchall("SELECT * FROM webhooks ORDER BY event, rowid")
+        else:
+            rows = self._fetchall("SELECT * FROM webhooks WHERE event = ? ORDER BY rowid", (event,))
+        return [self._row_to_doc(row, self.webhooks_collection_name) for row in rows]
+
+    async def get_webhook(self, webhook_id: str):
+        row = self._fetchone("SELECT * FROM webhooks WHERE id = ?", (webhook_id,))
         return self._row_to_doc(row, self.webhooks_collection_name)
 
     async def create_webhook_request(self, http_request: HTTPRequest):
 
         payload = http_request.model_dump(mode="json")
+        webhook_id = _generate_id()
 
         self._execute(
             """
-            INSERT INTO webhooks (id, event, method, url, headers, query_params, cookies, body)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO webhooks
+                (id, event, name, enabled, services, categories, method, url,
+                 headers, query_params, cookies, body, digest_seconds, digest_max_batch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
-                _generate_id(),
+                webhook_id,
                 payload.get("event"),
+                payload.get("name"),
+                int(payload.get("enabled", True)),
+                _dump_json(payload.get("services")),
+                _dump_json(payload.get("categories")),
                 payload.get("method"),
                 payload.get("url"),
                 _dump_json(payload.get("headers")),
                 _dump_json(payload.get("query_params")),
                 _dump_json(payload.get("cookies")),
                 _dump_json(payload.get("body")),
+                payload.get("digest_seconds"),
+                payload.get("digest_max_batch"),
             ),
         )
 
-        return await self.get_webhook(payload.get("event"))
+        return await self.get_webhook(webhook_id)
 
-    async def modify_webhook(self, event: str, update_fields: dict):
+    async def modify_webhook(self, webhook_id: str, update_fields: dict):
         """
         Modifies an existing webhook by updating only the specified fields.
 
         Args:
-            event: The event name of the webhook to modify
+            webhook_id: The ID of the webhook to modify
             update_fields: Dictionary containing only the fields to update
 
         Returns:
@@ -734,10 +991,10 @@ class Database:
         fields_to_update = {k: v for k, v in update_fields.items() if v is not None}
 
         if not fields_to_update:
-            return await self.get_webhook(event)
+            return await self.get_webhook(webhook_id)
 
-        json_columns = {"headers", "query_params", "cookies", "body"}
-        allowed_columns = {"method", "url"} | json_columns
+        json_columns = {"headers", "query_params", "cookies", "body", "services", "categories"}
+        allowed_columns = {"name", "enabled", "method", "url", "digest_seconds", "digest_max_batch"} | json_columns
 
         assignments = []
         params = []
@@ -745,30 +1002,195 @@ class Database:
             if key not in allowed_columns:
                 continue
             assignments.append(f"{key} = ?")
-            params.append(_dump_json(value) if key in json_columns else value)
+            if key in json_columns:
+                params.append(_dump_json(value))
+            elif key == "enabled":
+                params.append(int(value))
+            else:
+                params.append(value)
 
         if not assignments:
-            return await self.get_webhook(event)
+            return await self.get_webhook(webhook_id)
 
-        params.append(event)
+        params.append(webhook_id)
         self._execute(
-            f"UPDATE webhooks SET {', '.join(assignments)} WHERE event = ?",
+            f"UPDATE webhooks SET {', '.join(assignments)} WHERE id = ?",
             tuple(params),
         )
 
-        return await self.get_webhook(event)
+        return await self.get_webhook(webhook_id)
 
-    async def delete_webhook(self, event: str):
+    async def delete_webhook(self, webhook_id: str):
         """
-        Deletes a webhook by its event name.
+        Deletes a webhook by its ID.
 
         Args:
-            event: The event name of the webhook to delete
+            webhook_id: The ID of the webhook to delete
 
         Returns:
             The deleted document or None if not found
         """
-        deleted_document = await self.get_webhook(event)
-        self._execute("DELETE FROM webhooks WHERE event = ?", (event,))
+        deleted_document = await self.get_webhook(webhook_id)
+        self._execute("DELETE FROM webhooks WHERE id = ?", (webhook_id,))
 
         return deleted_document
+
+    async def enqueue_webhook_delivery(
+        self,
+        http_request: HTTPRequest,
+        context: dict,
+        digest_seconds: float = 0,
+        digest_max_batch: int = 1,
+        batch_key: str | None = None,
+    ) -> str:
+        """
+        Queue a webhook for the background workers; the request is rendered with `context` at delivery.
+
+        With `digest_seconds`, the context is appended to the open digest of
+        `batch_key` (a row still inside its window with room for another event),
+        or starts a new digest due `digest_seconds` from now. Digest rows hold a
+        list of contexts.
+        """
+
+        payload = http_request.model_dump(mode="json", by_alias=True)
+        now = datetime.now(timezone.utc)
+        now_iso = _to_iso(now)
+
+        with self._lock:
+
+            if digest_seconds > 0 and batch_key:
+
+                row = self.connection.execute(
+                    """
+                    UPDATE webhook_outbox
+                    SET context = json_insert(context, '$[#]', json(?)), batch_size = batch_size + 1
+                    WHERE id = (
+                        SELECT id FROM webhook_outbox
+                        WHERE batch_key = ? AND status = 'pending' AND attempts = 0
+                            AND batch_size < ? AND next_attempt_at > ?
+                        ORDER BY created_at
+                        LIMIT 1
+                    )
+                    RETURNING id
+                    """,
+                    (_dump_json(context), batch_key, digest_max_batch, now_iso),
+                ).fetchone()
+
+                if row is not None:
+                    self.connection.commit()
+                    self._local_writes += 1
+                    return row["id"]
+
+                stored_context = [context]
+                due_iso = _to_iso(now + timedelta(seconds=digest_seconds))
+
+            else:
+                batch_key, stored_context, due_iso = None, context, now_iso
+
+            delivery_id = _generate_id()
+
+            self.connection.execute(
+                """
+                INSERT INTO webhook_outbox (id, event, request, context, next_attempt_at, created_at, batch_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    delivery_id,
+                    payload.get("event"),
+                    _dump_json(payload),
+                    _dump_json(stored_context),
+                    due_iso,
+                    now_iso,
+                    batch_key,
+                ),
+            )
+            self.connection.commit()
+            self._local_writes += 1
+
+        return delivery_id
+
+    async def claim_webhook_delivery(self, lease_seconds: float) -> dict | None:
+        """
+        Atomically take the oldest due delivery and lease it for `lease_seconds`.
+
+        A claimed row stays `delivering` with `next_attempt_at` moved to the end
+        of the lease. If the worker dies mid-delivery the lease runs out and any
+        process picks the row up again, so deliveries are at-least-once.
+        """
+
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            row = self.connection.execute(
+                """
+                UPDATE webhook_outbox
+                SET status = 'delivering', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id = (
+                    SELECT id FROM webhook_outbox
+                    WHERE status IN ('pending', 'delivering') AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT 1
+                )
+                RETURNING *
+                """,
+                (_to_iso(now + timedelta(seconds=lease_seconds)), _to_iso(now)),
+            ).fetchone()
+            self.connection.commit()
+            self._local_writes += 1
+
+        return self._row_to_doc(row, self.webhook_outbox_collection_name)
+
+    async def complete_webhook_delivery(self, delivery_id: str) -> None:
+        self._execute("DELETE FROM webhook_outbox WHERE id = ?", (delivery_id,))
+
+    async def retry_webhook_delivery(self, delivery_id: str, delay_seconds: float, error: str) -> None:
+        next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+        self._execute(
+            "UPDATE webhook_outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (_to_iso(next_attempt_at), error, delivery_id),
+        )
+
+    async def dead_letter_webhook_delivery(self, delivery_id: str, error: str) -> None:
+        self._execute(
+            "UPDATE webhook_outbox SET status = 'dead', last_error = ? WHERE id = ?",
+            (error, delivery_id),
+        )
+
+    async def next_webhook_delivery_at(self) -> datetime | None:
+        """When the next queued or leased delivery becomes due, or None when the outbox is idle."""
+        row = self._fetchone(
+            "SELECT MIN(next_attempt_at) AS due FROM webhook_outbox WHERE status IN ('pending', 'delivering')"
+        )
+        return _from_iso(row["due"]) if row is not None else None
+
+    async def count_webhook_deliveries(self) -> dict[str, int]:
+        counts = {"pending": 0, "delivering": 0, "dead": 0}
+        for row in self._fetchall("SELECT status, COUNT(*) AS total FROM webhook_outbox GROUP BY status"):
+            counts[row["status"]] = row["total"]
+        return counts
+
+    async def list_webhook_dead_letters(self) -> list[dict]:
+        rows = self._fetchall("SELECT * FROM webhook_outbox WHERE status = 'dead' ORDER BY created_at")
+        return [self._row_to_doc(row, self.webhook_outbox_collection_name) for row in rows]
+
+    async def requeue_webhook_dead_letter(self, delivery_id: str) -> dict | None:
+        """Move a dead-lettered delivery back to the queue with a fresh attempt budget."""
+        self._execute(
+            "UPDATE webhook_outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE id = ? AND status = 'dead'",
+            (_to_iso(datetime.now(timezone.utc)), delivery_id),
+        )
+        row = self._fetchone("SELECT * FROM webhook_outbox WHERE id = ? AND status = 'pending'", (delivery_id,))
+        return self._row_to_doc(row, self.webhook_outbox_collection_name)
+
+    async def delete_webhook_dead_letter(self, delivery_id: str) -> dict | None:
+        row = self._fetchone("SELECT * FROM webhook_outbox WHERE id = ? AND status = 'dead'", (delivery_id,))
+        if row is not None:
+            self._execute("DELETE FROM webhook_outbox WHERE id = ?", (delivery_id,))
+        return self._row_to_doc(row, self.webhook_outbox_collection_name)
+
+
+# One connection per process, shared by every route and cache. Each API opens it in its
+# lifespan, so every uvicorn worker sets up its own connection after it starts.
+database = Database(
+    db_path=os.getenv("SQLITE_DB_PATH") or str(DATA_DIR / "app.db")
+)
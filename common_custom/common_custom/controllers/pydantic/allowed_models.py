@@ -2,7 +2,7 @@ from typing import Optional
 from datetime import datetime, timezone
 from pydantic import BaseModel, Field, IPvAnyAddress, EmailStr, field_validator, model_validator
 from common_custom.controllers.validators import MongoID
-from common_custom.controllers.pydantic.pending_models import ContactMethodsModel
+from common_custom.controllers.pydantic.pending_models import ContactMethodsModel, GeoInfoModel
 
 
 class AllowedConnectionModel(BaseModel):
@@ -11,6 +11,7 @@ class AllowedConnectionModel(BaseModel):
     contact_methods: ContactMethodsModel
     service_name: str
     ExpireAt: datetime | None
+    geo: GeoInfoModel | None = None
 
 
 class DeniedConnectionModel(BaseModel):
@@ -22,12 +22,21 @@ class LocationRequestModel(BaseModel):
     lon: Optional[float] = Field(None, ge=-180, le=180, examples=[None], description="Longitude of the requester")
 
 
+class GeoInfoModel(BaseModel):
+    country_code: Optional[str] = Field(None, examples=["NL"], description="ISO 3166-1 alpha-2 country code")
+    country: Optional[str] = Field(None, examples=["Netherlands"])
+    city: Optional[str] = Field(None, examples=["Amsterdam"])
+    asn: Optional[int] = Field(None, examples=[1136], description="Autonomous system number")
+    as_org: Optional[str] = Field(None, examples=["KPN B.V."], description="Autonomous system organization")
+
+
 class PendingConnectionDatabaseModel(BaseModel):
     id: Optional[MongoID] = Field(alias="_id", default=None)
     contact_methods: ContactMethodsModel
     ip_address: IPvAnyAddress
     service: ServiceItem | None = None
     location: LocationRequestModel
+    geo: GeoInfoModel | None = Field(None, description="Looked up from the local GeoIP database, when configured")
     notes: str | None = Field(None, max_length=200, description="Leave a note for the admin")
 
 
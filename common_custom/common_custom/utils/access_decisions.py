@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+from common_custom.controllers.database import Database, _client_ip_query_variants
+from common_custom.utils.service_catalog import ServiceCatalog
+
+
+class AccessDecisionTable:
+    """In-memory (client IP, public hostname, path) → allow/deny table for `GET /authorize`.
+
+    The table holds every active grant keyed by service; hostnames are resolved
+    through the shared `ServiceCatalog`. Like the catalog, it checks
+    `Database.data_version()` on every access, then `Database.grants_revision()`
+    only when that moved, and reloads grants only when an allowed connection was
+    created, edited or removed by any process. A grant or revoke from the private
+    API is visible on the next check, while pending requests, webhook deliveries
+    and unchanged checks never touch the grants table.
+    """
+
+    def __init__(self, database: Database, catalog: ServiceCatalog | None = None):
+        self._database = database
+        self._catalog = catalog or ServiceCatalog(database)
+        self._version: tuple[int, int] | None = None
+        self._revision: int | None = None
+        self._grants: dict[str, dict[str, datetime | None]] = {}
+
+    async def _refresh(self) -> None:
+
+        version = self._database.data_version()
+
+        if version == self._version:
+            return
+
+        revision = self._database.grants_revision()
+
+        if revision != self._revision:
+
+            grants: dict[str, dict[str, datetime | None]] = {}
+
+            for grant in await self._database.list_active_grants():
+
+                by_ip = grants.setdefault(grant["service_name"], {})
+                expire_at = grant["ExpireAt"]
+                current = by_ip.get(grant["ip_address"], expire_at)
+
+                # Keep the latest expiry when the same IP holds several grants; None means permanent.
+                if current is None or expire_at is None:
+                    by_ip[grant["ip_address"]] = None
+                else:
+                    by_ip[grant["ip_address"]] = max(current, expire_at)
+
+            self._grants = grants
+            self._revision = revision
+
+        self._version = version
+
+    async def is_allowed(self, ip_str: str, host: str | None, path: str | None = "/", service_name: str | None = None) -> bool:
+        """True when `ip_str` holds a non-expired grant for `service_name`, or else for the service served on `host` at `path`."""
+
+        if service_name:
+            service = await self._catalog.get(service_name)
+        else:
+            service = await self._catalog.find_by_host(host, path)
+
+        if service is None:
+            return False
+
+        await self._refresh()
+
+        by_ip = self._grants.get(service.get("name"))
+
+        if not by_ip:
+            return False
+
+        now = None
+
+        for variant in _client_ip_query_variants(ip_str):
+
+            if variant not in by_ip:
+                continue
+
+            expire_at = by_ip[variant]
+
+            if expire_at is None:
+                return True
+
+            if now is None:
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+            if expire_at > now:
+                return True
+
+        return False
@@ -1,13 +1,30 @@
+import os
 import json
+import time
+import threading
 from pathlib import Path
+from dotenv import load_dotenv
 
 from common_custom.utils.pydantic.contact_fields_models import (
     ContactFieldFlagsModel,
     ContactFieldsConfigResponseModel,
 )
 
+DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
+
+load_dotenv(DATA_DIR / ".env")
+
 CONTACT_FIELD_NAMES: tuple[str, ...] = ("name", "email", "phone_number")
 
+# How long a cached config is trusted before the file's mtime/size is checked
+# again. Saves in this process invalidate immediately; other processes see a
+# change within this window.
+CONTACT_FIELDS_RECHECK_SECONDS = float(os.getenv("CONTACT_FIELDS_RECHECK_SECONDS", 1.0))
+
+# path -> (checked_at monotonic, (mtime_ns, size) or None, parsed config)
+_config_cache: dict[str, tuple[float, tuple[int, int] | None, dict[str, dict[str, bool]]]] = {}
+_config_cache_lock = threading.Lock()
+
 
 def default_field_flags() -> dict[str, bool]:
     return {"visible": True, "required": False}
@@ -40,8 +57,15 @@ def ensure_contact_fields_file(path: Path) -> None:
         fh.write("\n")
 
 
-def load_contact_fields_config(path: Path) -> dict[str, dict[str, bool]]:
-    """Load ``contact-fields.json`` with per-field ``visible``/``required``."""
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_contact_fields_config(path: Path) -> dict[str, dict[str, bool]]:
     out = {field: default_field_flags() for field in CONTACT_FIELD_NAMES}
     try:
         with open(path, "r", encoding="utf-8") as fh:
@@ -56,6 +80,48 @@ def load_contact_fields_config(path: Path) -> dict[str, dict[str, bool]]:
     return out
 
 
+def _copy_config(config: dict[str, dict[str, bool]]) -> dict[str, dict[str, bool]]:
+    return {field: dict(flags) for field, flags in config.items()}
+
+
+def load_contact_fields_config(path: Path) -> dict[str, dict[str, bool]]:
+    """Load ``contact-fields.json`` with per-field ``visible``/``required``.
+
+    The parsed file is cached per path and keyed on its mtime and size. Within
+    ``CONTACT_FIELDS_RECHECK_SECONDS`` of the last check a call does no I/O;
+    after that one ``stat`` decides whether the file is read again.
+    """
+    key = str(path)
+    now = time.monotonic()
+
+    with _config_cache_lock:
+        cached = _config_cache.get(key)
+
+    if cached is not None and now - cached[0] < CONTACT_FIELDS_RECHECK_SECONDS:
+        return _copy_config(cached[2])
+
+    signature = _file_signature(path)
+
+    if cached is not None and signature is not None and signature == cached[1]:
+        config = cached[2]
+    else:
+        config = _read_contact_fields_config(path)
+
+    with _config_cache_lock:
+        _config_cache[key] = (now, signature, config)
+
+    return _copy_config(config)
+
+
+def invalidate_contact_fields_cache(path: Path | None = None) -> None:
+    """Drop the cached config for ``path`` (or every path)."""
+    with _config_cache_lock:
+        if path is None:
+            _config_cache.clear()
+        else:
+            _config_cache.pop(str(path), None)
+
+
 def normalize_contact_fields_config(
     config: dict[str, dict[str, bool]],
 ) -> dict[str, dict[str, bool]]:
@@ -75,9 +141,13 @@ def save_contact_fields_config(
     normalized = normalize_contact_fields_config(config)
     path.parent.mkdir(parents=True, exist_ok=True)
     payload = {field: normalized[field] for field in CONTACT_FIELD_NAMES}
-    with open(path, "w", encoding="utf-8") as fh:
+    # Write then rename, so readers in other processes never parse a half-written file.
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as fh:
         json.dump(payload, fh, indent=2)
         fh.write("\n")
+    os.replace(temp_path, path)
+    invalidate_contact_fields_cache(path)
     return normalized
 
 
@@ -0,0 +1,147 @@
+import os
+import ipaddress
+from pathlib import Path
+from collections import OrderedDict
+from dotenv import load_dotenv
+from common_custom.utils.logger import create_logger
+
+try:
+    import maxminddb
+except ImportError:  # Optional: without it no record is enriched.
+    maxminddb = None
+
+DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
+
+load_dotenv(DATA_DIR / ".env")
+
+log = create_logger(alias="GeoIP", logger_name="common_custom.geoip")
+
+GEOIP_ENABLED = os.getenv("GEOIP_ENABLED") != 'False'
+GEOIP_CITY_DB = os.getenv("GEOIP_CITY_DB") or str(DATA_DIR / "GeoLite2-City.mmdb")
+GEOIP_ASN_DB = os.getenv("GEOIP_ASN_DB") or str(DATA_DIR / "GeoLite2-ASN.mmdb")
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", 4096))
+
+
+def _english_name(record: dict | None) -> str | None:
+    if not record:
+        return None
+    return (record.get("names") or {}).get("en")
+
+
+class GeoIPResolver:
+    """Offline IP → country / city / ASN lookups from local MaxMind-format (`.mmdb`) files.
+
+    A City (or Country) database and an ASN database are both optional; each
+    present file is opened once, memory-mapped, by the `maxminddb` reader, so a
+    lookup is a tree walk over shared pages with nothing parsed up front.
+    Results, misses included, are kept in an LRU capped at `cache_size`
+    addresses.
+
+    When the `maxminddb` package is missing, enrichment is disabled, or no file
+    exists, `lookup()` returns `None` straight away.
+    """
+
+    def __init__(
+        self,
+        city_db_path: str | None = GEOIP_CITY_DB,
+        asn_db_path: str | None = GEOIP_ASN_DB,
+        cache_size: int = GEOIP_CACHE_SIZE,
+        enabled: bool = GEOIP_ENABLED,
+    ):
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, dict | None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._city = self._open(city_db_path) if enabled else None
+        self._asn = self._open(asn_db_path) if enabled else None
+
+    @property
+    def available(self) -> bool:
+        return self._city is not None or self._asn is not None
+
+    @staticmethod
+    def _open(path: str | None):
+
+        if not path or not Path(path).is_file():
+            return None
+
+        if maxminddb is None:
+            log.warning(f"GeoIP database '{path}' found but the optional 'maxminddb' package is not installed")
+            return None
+
+        try:
+            reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+        except (OSError, ValueError) as e:
+            log.error(f"Could not open GeoIP database '{path}': {e}")
+            return None
+
+        log.info(f"Loaded GeoIP database '{path}' ({reader.metadata().database_type})")
+        return reader
+
+    def _resolve(self, ip_str: str) -> dict | None:
+
+        try:
+            address = ipaddress.ip_address(ip_str)
+        except ValueError:
+            return None
+
+        if not address.is_global:
+            return None
+
+        geo = {}
+
+        if self._city is not None:
+            record = self._city.get(address) or {}
+            country = record.get("country") or record.get("registered_country") or {}
+            geo["country_code"] = country.get("iso_code")
+            geo["country"] = _english_name(country)
+            geo["city"] = _english_name(record.get("city"))
+
+        if self._asn is not None:
+            record = self._asn.get(address) or {}
+            geo["asn"] = record.get("autonomous_system_number")
+            geo["as_org"] = record.get("autonomous_system_organization")
+
+        return geo if any(value is not None for value in geo.values()) else None
+
+    def lookup(self, ip_str: str | None) -> dict | None:
+        """`{country_code, country, city, asn, as_org}` of `ip_str`, or `None` when unknown."""
+
+        if not ip_str or not self.available:
+            return None
+
+        if ip_str in self._cache:
+            self._cache.move_to_end(ip_str)
+            self.hits += 1
+            return self._cache[ip_str]
+
+        self.misses += 1
+        geo = self._resolve(ip_str)
+
+        if self.cache_size > 0:
+            self._cache[ip_str] = geo
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return geo
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "available": self.available,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+
+        for reader in (self._city, self._asn):
+            if reader is not None:
+                reader.close()
+
+        self._city = self._asn = None
+        self._cache.clear()
+
+
+geoip = GeoIPResolver()
@@ -0,0 +1,308 @@
+import os
+import re
+import sys
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import threading
+import logging.handlers
+from pathlib import Path
+from datetime import datetime
+from dotenv import load_dotenv
+from colorama import Fore, Style, init as colorama_init
+
+DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
+
+load_dotenv(DATA_DIR / ".env")
+
+LOGGER_LEVEL = os.getenv("LOGGER_LEVEL", "INFO")
+LOGGER_PATH = os.getenv("LOGGER_PATH") or str(DATA_DIR / "logs")
+LOGGER_FORMAT = os.getenv("LOGGER_FORMAT", "text").strip().lower() or "text"
+LOGGER_BACKUP_COUNT = int(os.getenv("LOGGER_BACKUP_COUNT", 7))
+LOGGER_COMPRESS = os.getenv("LOGGER_COMPRESS", "True").strip().lower() in ("1", "true", "yes", "on")
+
+LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+colorama_init()
+
+
+class DailyFileHandler(logging.handlers.TimedRotatingFileHandler):
+    """One ``YYYY-MM-DD.log`` file per day.
+
+    On rollover the finished day is gzip-compressed and files beyond
+    ``backupCount`` days are removed, both on a short-lived background
+    thread so the log writer never waits on them. Several processes (uvicorn
+    workers) may append to the same files: nothing is renamed, and only the
+    first process to roll over archives the finished day.
+    """
+
+    def __init__(self, log_dir, *args, backupCount=LOGGER_BACKUP_COUNT, compress=LOGGER_COMPRESS, **kwargs):
+        self.log_dir = log_dir
+        self.compress = compress
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+        log_file = os.path.join(self.log_dir, f"{self.current_date}.log")
+        super().__init__(log_file, when="midnight", interval=1, backupCount=backupCount, **kwargs)
+
+    def doRollover(self):
+        finished = self.baseFilename
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+        self.baseFilename = os.path.join(self.log_dir, f"{self.current_date}.log")
+        super().doRollover()
+
+        if finished != self.baseFilename:
+            threading.Thread(target=self._archive, args=(finished,), name="log-archiver", daemon=True).start()
+
+    def rotate(self, source, dest):
+        # Files are named by date already; the base class would rename the new day's
+        # file, which another process may have started writing to.
+        pass
+
+    def getFilesToDelete(self):
+        # Dated files are pruned by `_archive`, not by the base class' suffix matching.
+        return []
+
+    def _archive(self, finished: str) -> None:
+
+        try:
+
+            if self.compress and os.path.isfile(finished):
+                # Exclusive create: when another process got here first, its archive stands.
+                with open(finished, "rb") as source, open(f"{finished}.gz", "xb") as raw, gzip.open(raw, "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(finished)
+
+            if self.backupCount > 0:
+
+                dated = sorted(
+                    name for name in os.listdir(self.log_dir)
+                    if name.endswith((".log", ".log.gz")) and os.path.join(self.log_dir, name) != self.baseFilename
+                )
+
+                for name in dated[:-self.backupCount]:
+                    try:
+                        os.remove(os.path.join(self.log_dir, name))
+                    except FileNotFoundError:
+                        pass
+
+        except FileExistsError:
+            pass
+        except OSError as e:
+            sys.stderr.write(f"Failed to archive log file {finished}: {e}\n")
+
+
+class RemoveColorFormatter(logging.Formatter):
+    ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+    def format(self, record):
+        original_message = super().format(record)
+
+        # Most records carry no colour codes; skip the regex for them.
+        if "\x1b" not in original_message:
+            return original_message
+
+        return self.ANSI_ESCAPE.sub('', original_message)
+
+
+class ColoredFormatter(logging.Formatter):
+
+    LEVEL_COLORS = {
+        logging.DEBUG: Fore.BLUE,
+        logging.INFO: Fore.GREEN,
+        logging.WARNING: Fore.YELLOW,
+        logging.ERROR: Fore.RED,
+        logging.CRITICAL: Fore.MAGENTA,
+    }
+
+    def format(self, record):
+        # Records are shared by every handler of the listener; colour a copy.
+        record = logging.makeLogRecord(record.__dict__)
+        level_color = self.LEVEL_COLORS.get(record.levelno, Fore.WHITE)
+        record.levelname = f"{level_color}{record.levelname}{Style.RESET_ALL}"
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, alias, logger, message and exception if any."""
+
+    def format(self, record):
+
+        payload = {
+            "time": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "alias": getattr(record, "alias", record.name),
+            "logger": record.name,
+            "message": RemoveColorFormatter.ANSI_ESCAPE.sub('', record.getMessage()),
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class _AliasFilter(logging.Filter):
+    """Tags records with the logger's alias and the log directory they belong to."""
+
+    def __init__(self, alias: str, logs_key: str):
+        super().__init__()
+        self.alias = alias
+        self.logs_key = logs_key
+
+    def filter(self, record):
+        record.alias = self.alias
+        record.logs_key = self.logs_key
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without pre-rendering them into plain strings."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class _LogWriter:
+    """Process-wide queue and the single thread that writes every record to the console and log files."""
+
+    def __init__(self) -> None:
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.listener: logging.handlers.QueueListener | None = None
+        self.file_handlers: dict[str, logging.Handler] = {}
+        self.console_handler: logging.Handler | None = None
+        self.lock = threading.Lock()
+
+    def _console_handler(self, log_date_format: str) -> logging.Handler:
+
+        if self.console_handler is None:
+
+            # Write UTF-8 without replacing sys.stdout for the rest of the process.
+            stream = sys.stdout
+
+            if hasattr(stream, "reconfigure") and (stream.encoding or "").lower() != "utf-8":
+                stream.reconfigure(encoding="utf-8")
+
+            handler = logging.StreamHandler(stream)
+
+            if LOGGER_FORMAT == "json":
+                handler.setFormatter(JsonFormatter())
+            else:
+                handler.setFormatter(ColoredFormatter(
+                    fmt=f'{Fore.LIGHTBLACK_EX}[{Fore.LIGHTBLUE_EX}%(asctime)s{Fore.LIGHTBLACK_EX}] {Fore.LIGHTBLACK_EX}[{Fore.LIGHTBLUE_EX}%(alias)s{Fore.LIGHTBLACK_EX}] [%(levelname)s{Fore.LIGHTBLACK_EX}] {Fore.WHITE}%(message)s{Style.RESET_ALL}',
+                    datefmt=log_date_format,
+                ))
+
+            self.console_handler = handler
+
+        return self.console_handler
+
+    def _file_handler(self, logs_directory: str) -> logging.Handler:
+
+        key = os.path.abspath(logs_directory)
+
+        if key not in self.file_handlers:
+
+            os.makedirs(key, exist_ok=True)
+
+            handler = DailyFileHandler(key, encoding='utf-8')
+            handler.addFilter(lambda record, key=key: getattr(record, "logs_key", key) == key)
+
+            if LOGGER_FORMAT == "json":
+                handler.setFormatter(JsonFormatter())
+            else:
+                handler.setFormatter(RemoveColorFormatter('[%(asctime)s] [%(alias)s] [%(levelname)-8s] %(message)s'))
+
+            self.file_handlers[key] = handler
+
+        return self.file_handlers[key]
+
+    def attach(self, logs_directory: str, log_date_format: str) -> None:
+        """Make sure the writer thread serves ``logs_directory`` and is running."""
+
+        with self.lock:
+
+            console = self._console_handler(log_date_format)
+            file_handler = self._file_handler(logs_directory)
+            handlers = (console, *self.file_handlers.values())
+
+            if self.listener is not None and file_handler in self.listener.handlers:
+                return
+
+            if self.listener is not None:
+                self.listener.stop()
+            else:
+                atexit.register(self.stop)
+
+            self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Flush every queued record and stop the writer thread."""
+
+        with self.lock:
+
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+            for handler in (self.console_handler, *self.file_handlers.values()):
+                if handler is not None:
+                    handler.flush()
+
+
+_writer = _LogWriter()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background writer (also runs at exit)."""
+    _writer.stop()
+
+
+def create_logger(
+    alias: str,
+    log_date_format: str = "%d-%m-%Y %H:%M:%S",
+    logs_directory: str = LOGGER_PATH,
+    log_level: str = LOGGER_LEVEL,
+    logger_name: str | None = None
+) -> logging.Logger:
+    """Return a logger whose records are queued and written by one background thread.
+
+    Calls never block on console or file I/O. Output is coloured text by
+    default or one JSON object per line with ``LOGGER_FORMAT=json``; daily
+    files under ``logs_directory`` are compressed once the day is over.
+    """
+
+    log: logging.Logger = logging.getLogger(logger_name or alias)
+    log.propagate = False
+
+    if log.handlers:
+        return log
+
+    log.setLevel(LOG_LEVELS.get(log_level, logging.INFO))
+
+    _writer.attach(logs_directory, log_date_format)
+
+    queue_handler = _QueueHandler(_writer.queue)
+    queue_handler.addFilter(_AliasFilter(alias, os.path.abspath(logs_directory)))
+    log.addHandler(queue_handler)
+
+    return log
@@ -1,8 +1,19 @@
-import asyncio
-import requests
-from jinja2 import Template
-from pydantic import BaseModel
+import httpx
+from collections import OrderedDict
+from jinja2 import Environment, Template
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import Any, Dict, Optional, Literal
+from common_custom.utils.logger import create_logger
+from common_custom.controllers.validators import MongoID
+from common_custom.utils.webhook_client import CircuitOpenError, webhook_client
+
+log = create_logger(alias="Webhooks", logger_name="common_custom.webhooks")
+
+# Shared by every webhook template; same defaults as a bare `jinja2.Template(source)`.
+TEMPLATE_ENVIRONMENT = Environment()
+TEMPLATE_MARKERS = ("{{", "{%", "{#")
+COMPILED_WEBHOOK_CACHE_SIZE = 128
 
 
 class WebhookEventBase(BaseModel):
@@ -10,12 +21,19 @@ class WebhookEventBase(BaseModel):
 
 
 class HTTPRequest(WebhookEventBase):
+    id: Optional[MongoID] = Field(alias="_id", default=None)
+    name: Optional[str] = Field(None, max_length=64, description="Label telling the webhooks of an event apart")
+    enabled: bool = True
+    services: Optional[list[str]] = Field(None, description="Only fire for these service names; null or empty fires for every service")
+    categories: Optional[list[str]] = Field(None, description="Only fire for services in these categories; null or empty fires for every category")
     method: Literal["GET", "HEAD", "POST", "PUT", "DELETE"]
     url: str
     headers: Optional[Dict[str, Any]] = None
     query_params: Optional[Dict[str, Any]] = None
     cookies: Optional[Dict[str, Any]] = None
     body: Optional[Dict[str, Any]] = None
+    digest_seconds: Optional[int] = Field(None, ge=0, le=3600, description="Merge events arriving within this many seconds into one request; 0 or null sends each event on its own")
+    digest_max_batch: Optional[int] = Field(None, ge=1, le=1000, description="Most events merged into one digest (default WEBHOOK_DIGEST_MAX_BATCH)")
 
 
 class CreateWebhookResponseModel(HTTPRequest):
@@ -23,71 +41,175 @@ class CreateWebhookResponseModel(HTTPRequest):
 
 
 class DeleteWebhookRequestModel(WebhookEventBase):
-    pass
+    id: Optional[MongoID] = Field(None, description="Webhook to remove; may be omitted while the event has a single webhook")
 
 
 class DeleteWebhookResponseModel(WebhookEventBase):
+    id: Optional[str] = Field(alias="_id", default=None)
     message: Literal["The webhook has been successfully deleted!"]
 
 
 class ModifyWebhookRequestModel(WebhookEventBase):
+    id: Optional[MongoID] = Field(None, description="Webhook to modify; may be omitted while the event has a single webhook")
+    name: Optional[str] = Field(None, max_length=64)
+    enabled: Optional[bool] = None
+    services: Optional[list[str]] = None
+    categories: Optional[list[str]] = None
     method: Optional[Literal["GET", "HEAD", "POST", "PUT", "DELETE"]] = None
     url: Optional[str] = None
     headers: Optional[Dict[str, Any]] = None
     query_params: Optional[Dict[str, Any]] = None
     cookies: Optional[Dict[str, Any]] = None
     body: Optional[Dict[str, Any]] = None
+    digest_seconds: Optional[int] = Field(None, ge=0, le=3600)
+    digest_max_batch: Optional[int] = Field(None, ge=1, le=1000)
 
 
 class ModifyWebhookResponseModel(HTTPRequest):
     message: Literal["The webhook has been successfully modified!"]
 
 
+class WebhookDeliveryModel(BaseModel):
+    id: Optional[str] = Field(alias="_id", default=None)
+    event: str
+    request: Dict[str, Any]
+    context: Optional[Dict[str, Any] | list[Dict[str, Any]]] = Field(None, description="Template variables of the event, or of every event merged into a digest")
+    batch_size: int = Field(1, description="Events merged into this delivery")
+    status: Literal["pending", "delivering", "dead"]
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+
+
+class WebhookOutboxStatsModel(BaseModel):
+    pending: int = Field(description="Deliveries waiting for their first or next attempt")
+    delivering: int = Field(description="Deliveries currently leased by a worker")
+    dead: int = Field(description="Dead-lettered deliveries")
+    workers: int = Field(description="Delivery workers running in this process")
+
+
+def compile_template_tree(data: Any) -> Any:
+    """Compile every string holding Jinja syntax once; plain strings and other values are kept as-is."""
+    if isinstance(data, str):
+        if any(marker in data for marker in TEMPLATE_MARKERS):
+            return TEMPLATE_ENVIRONMENT.from_string(data)
+        return data
+    if isinstance(data, dict):
+        return {k: compile_template_tree(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [compile_template_tree(item) for item in data]
+    return data
+
+
+def render_template_tree(tree: Any, context: Dict[str, Any]) -> Any:
+    if isinstance(tree, Template):
+        return tree.render(context)
+    if isinstance(tree, dict):
+        return {k: render_template_tree(v, context) for k, v in tree.items()}
+    if isinstance(tree, list):
+        return [render_template_tree(item, context) for item in tree]
+    return tree
+
+
+class CompiledWebhook:
+    """A webhook whose url, headers, query params, cookies and body are compiled once and rendered per event."""
+
+    __slots__ = ("request", "url", "headers", "query_params", "cookies", "body", "services", "categories")
+
+    _cache: "OrderedDict[str, CompiledWebhook]" = OrderedDict()
+
+    def __init__(self, request: HTTPRequest):
+        self.request = request
+        self.url = compile_template_tree(request.url)
+        self.headers = compile_template_tree(request.headers or {})
+        self.query_params = compile_template_tree(request.query_params or {})
+        self.cookies = compile_template_tree(request.cookies or {})
+        self.body = compile_template_tree(request.body or {})
+        self.services = frozenset(value.strip().lower() for value in request.services or ())
+        self.categories = frozenset(value.strip().lower() for value in request.categories or ())
+
+    def matches(self, service: str | None = None, category: str | None = None) -> bool:
+        """Whether an event for `service` (in `category`) passes this webhook's filters."""
+        if self.services and (service or "").strip().lower() not in self.services:
+            return False
+        if self.categories and (category or "").strip().lower() not in self.categories:
+            return False
+        return True
+
+    @classmethod
+    def for_request(cls, request: HTTPRequest) -> "CompiledWebhook":
+        """Compiled form of `request`, shared by every request with the same definition (LRU-bounded)."""
+
+        key = request.model_dump_json()
+        compiled = cls._cache.get(key)
+
+        if compiled is None:
+            compiled = cls(request)
+            cls._cache[key] = compiled
+            while len(cls._cache) > COMPILED_WEBHOOK_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(key)
+
+        return compiled
+
+    def render(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "url": render_template_tree(self.url, context),
+            "headers": render_template_tree(self.headers, context),
+            "params": render_template_tree(self.query_params, context),
+            "cookies": render_template_tree(self.cookies, context),
+            "json": render_template_tree(self.body, context),
+        }
+
+
+class LatencyHistogramModel(BaseModel):
+    buckets: Dict[str, int] = Field(description="Cumulative request counts per upper bound in seconds, plus `+Inf`")
+    count: int
+    sum: float = Field(description="Total seconds spent in requests")
+
+
+class WebhookDestinationStatsModel(BaseModel):
+    circuit: Literal["closed", "open", "half_open"]
+    in_flight: int
+    requests: int
+    failures: int = Field(description="Connection errors, timeouts and 5xx responses")
+    rejected: int = Field(description="Deliveries failed fast while the circuit was open")
+    latency_seconds: LatencyHistogramModel
+
+
 class WebhookValidator:
 
     @staticmethod
     def render_recursive(data: Any, context: Dict[str, Any]) -> Any:
-        if isinstance(data, str):
-            return Template(data).render(**context)
-        if isinstance(data, dict):
-            return {k: WebhookValidator.render_recursive(v, context) for k, v in data.items()}
-        if isinstance(data, list):
-            return [WebhookValidator.render_recursive(item, context) for item in data]
-        return data
+        return render_template_tree(compile_template_tree(data), context)
 
     @staticmethod
     async def execute_webhook(request: HTTPRequest, context: Dict[str, Any]):
+        url = request.url
         try:
-            url = WebhookValidator.render_recursive(request.url, context)
-            headers = WebhookValidator.render_recursive(request.headers or {}, context)
-            params = WebhookValidator.render_recursive(request.query_params or {}, context)
-            cookies = WebhookValidator.render_recursive(request.cookies or {}, context)
-            body = WebhookValidator.render_recursive(request.body or {}, context)
-
-            print(f"Sending {request.method} to {url}...")
-
-            response = await asyncio.to_thread(
-                requests.request,
-                method=request.method,
-                url=url,
-                headers=headers,
-                params=params,
-                cookies=cookies,
-                json=body,
-                timeout=10
-            )
+            rendered = CompiledWebhook.for_request(request).render(context)
+            url = rendered["url"]
+
+            log.info(f"Sending {request.method} to {url}...")
+
+            response = await webhook_client.request(request.method, **rendered)
 
             return response
 
-        except requests.exceptions.Timeout:
-            print(f"Webhook timed out: {url}")
+        except CircuitOpenError:
+            log.warning(f"Webhook skipped, destination is failing: {url}")
+            return None
+        except httpx.TimeoutException:
+            log.warning(f"Webhook timed out: {url}")
             return None
-        except requests.exceptions.ConnectionError:
-            print(f"Webhook connection failed: {url}")
+        except httpx.TransportError:
+            log.warning(f"Webhook connection failed: {url}")
             return None
-        except requests.exceptions.RequestException as e:
-            print(f"Webhook error: {e}")
+        except httpx.HTTPError as e:
+            log.error(f"Webhook error: {e}")
             return None
         except Exception as e:
-            print(f"Unexpected error processing webhook: {e}")
+            log.exception(f"Unexpected error processing webhook: {e}")
             return None
@@ -0,0 +1,126 @@
+import time
+import ipaddress
+from collections import OrderedDict
+from fastapi import HTTPException, Request, status
+
+
+def client_key(ip_str: str | None) -> str:
+    """Bucket key for a client: the IPv4 address, or the /64 network of an IPv6 address.
+
+    IPv4-mapped IPv6 addresses (`::ffff:203.0.113.7`) count as their IPv4 address.
+    """
+    try:
+        address = ipaddress.ip_address((ip_str or "").strip())
+    except ValueError:
+        return ip_str or ""
+
+    if address.version == 6:
+        if address.ipv4_mapped is not None:
+            return str(address.ipv4_mapped)
+        return str(ipaddress.ip_network(f"{address}/64", strict=False))
+
+    return str(address)
+
+
+def parse_rate(value: str | None, default: tuple[int, float]) -> tuple[int, float]:
+    """Parse `"<requests>/<seconds>"` (e.g. `"10/60"`); `"0"` or `"off"` disables the limit."""
+    if value is None or not value.strip():
+        return default
+    value = value.strip().lower()
+    if value in ("0", "off", "false"):
+        return 0, default[1]
+    count, _, seconds = value.partition("/")
+    return int(count), float(seconds or 60)
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets holding at most `capacity` requests, refilled over `period` seconds.
+
+    Buckets live in an LRU-ordered dict capped at `max_buckets`; the least
+    recently seen client is evicted first. An evicted client simply starts
+    again with a full bucket. Meant to be called from the event loop only.
+    """
+
+    def __init__(self, capacity: int, period: float, max_buckets: int = 10_000):
+        self.capacity = capacity
+        self.period = period
+        self.refill_per_second = capacity / period if period > 0 else float("inf")
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def acquire(self, key: str) -> float:
+        """Take one token for `key`. Returns 0 when allowed, else the seconds until a token is available."""
+
+        if self.capacity <= 0:
+            self.allowed += 1
+            return 0.0
+
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (float(self.capacity), now))
+        tokens = min(float(self.capacity), tokens + (now - updated_at) * self.refill_per_second)
+
+        if tokens >= 1.0:
+            tokens -= 1.0
+            retry_after = 0.0
+            self.allowed += 1
+        else:
+            retry_after = (1.0 - tokens) / self.refill_per_second
+            self.limited += 1
+
+        self._buckets[key] = (tokens, now)
+
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+            self.evicted += 1
+
+        return retry_after
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "buckets": len(self._buckets),
+            "evicted": self.evicted,
+        }
+
+
+class RateLimiter:
+    """Named per-route limiters, used as FastAPI dependencies.
+
+    `Depends(rate_limiter.limit("request_access"))` rejects a request with `429`
+    and a `Retry-After` header before the route body runs, so a flooding client
+    costs no database work.
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, float]], max_buckets: int = 10_000, enabled: bool = True):
+        self.enabled = enabled
+        self.limiters = {
+            name: TokenBucketLimiter(capacity, period, max_buckets)
+            for name, (capacity, period) in limits.items()
+        }
+
+    def limit(self, name: str):
+
+        limiter = self.limiters[name]
+
+        async def dependency(request: Request) -> None:
+
+            if not self.enabled:
+                return
+
+            retry_after = limiter.acquire(client_key(request.client.host if request.client else None))
+
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests from this network address, please try again later.",
+                    headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+                )
+
+        return dependency
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
@@ -0,0 +1,80 @@
+from common_custom.controllers.database import Database
+from common_custom.utils.service_matching import (
+    ServiceRoutes,
+    path_from_redirect,
+    public_hostname_from_redirect,
+)
+
+
+class ServiceCatalog:
+    """In-process snapshot of the `services` table with a hostname and path index.
+
+    Lookups go through `ServiceRoutes`: exact hostnames are a dict probe,
+    wildcard (`*.apps.example.com`) and suffix (`.example.com`) names a
+    `HostnameTrie` walk, and path-prefix services (`tools.example.com/grafana`)
+    a `PathPrefixTree` walk within the matched host.
+
+    `Database.data_version()` is checked on every access (one PRAGMA, no table
+    read). Only when it moved is `Database.services_revision()` read, and only
+    when that moved — a service was created, modified or deleted by any process —
+    is the snapshot rebuilt. Grants, pending requests and other writes leave it
+    untouched.
+
+    Returned documents are shared by every caller and must not be mutated.
+    """
+
+    def __init__(self, database: Database):
+        self._database = database
+        self._version: tuple[int, int] | None = None
+        self._revision: int | None = None
+        self._services: list[dict] = []
+        self._routes = ServiceRoutes([])
+        self._names: frozenset[str] = frozenset()
+        self._by_name: dict[str, dict] = {}
+
+    async def _refresh(self) -> None:
+
+        version = self._database.data_version()
+
+        if version == self._version:
+            return
+
+        revision = self._database.services_revision()
+
+        if revision != self._revision:
+
+            services = await self._database.list_all_services()
+
+            self._services = services
+            self._routes = ServiceRoutes(services)
+            self._names = frozenset(service.get("name") for service in services)
+            self._by_name = {service.get("name"): service for service in services}
+            self._revision = revision
+
+        self._version = version
+
+    async def services(self) -> list[dict]:
+        """Every catalog row, as returned by `Database.list_all_services()`."""
+        await self._refresh()
+        return list(self._services)
+
+    async def names(self) -> frozenset[str]:
+        await self._refresh()
+        return self._names
+
+    async def get(self, name: str | None) -> dict | None:
+        """Service row with exactly this `name`."""
+        await self._refresh()
+        return self._by_name.get(name)
+
+    async def find_by_host(self, host: str | None, path: str | None = "/") -> dict | None:
+        """Service serving `host` (exact, else most specific pattern) at the longest prefix of `path`."""
+        await self._refresh()
+        return self._routes.find(host, path)
+
+    async def find_for_redirect(self, redirect: str) -> dict | None:
+        """Same result as `find_service_for_redirect(services, redirect)`, without a scan."""
+        redirect_host = public_hostname_from_redirect(redirect)
+        if not redirect_host:
+            return None
+        return await self.find_by_host(redirect_host, path_from_redirect(redirect))
@@ -19,6 +19,195 @@ def normalize_public_hostname(value: object) -> str:
     return s
 
 
+def service_path_prefix(value: object) -> str:
+    """Path prefix of a service name such as `tools.example.com/grafana` (`/grafana`), or `/`.
+
+    Empty segments are dropped and paths keep their case, as nginx locations do.
+    """
+    if value is None:
+        return "/"
+    s = str(value).strip()
+    for prefix in ("http://", "https://"):
+        if s.lower().startswith(prefix):
+            s = s[len(prefix):]
+    if "/" not in s:
+        return "/"
+    return normalize_path(s.split("/", 1)[1])
+
+
+def normalize_path(path: str | None) -> str:
+    """`/a//b/` → `/a/b`; anything empty → `/`. Query strings and fragments are not expected here."""
+    segments = [segment for segment in (path or "").split("/") if segment]
+    return "/" + "/".join(segments)
+
+
+def is_hostname_pattern(name: object) -> bool:
+    """True for nginx-style wildcard (`*.apps.example.com`) or suffix (`.example.com`) service names."""
+    s = normalize_public_hostname(name)
+    return s.startswith("*.") or (s.startswith(".") and len(s) > 1)
+
+
+def is_valid_hostname_pattern(name: object) -> bool:
+    """A `*` may only appear as a whole leading label, and a pattern needs at least two labels after it."""
+    if "*" in service_path_prefix(name):
+        return False
+    s = normalize_public_hostname(name)
+    if "*" not in s and not s.startswith("."):
+        return True
+    if not is_hostname_pattern(s):
+        return False
+    rest = s[2:] if s.startswith("*.") else s[1:]
+    labels = rest.split(".")
+    return "*" not in rest and len(labels) >= 2 and all(labels)
+
+
+class HostnameTrie:
+    """Reversed-label trie resolving hostnames against wildcard and suffix patterns.
+
+    Follows nginx `server_name` semantics: `*.example.com` matches any name with
+    at least one more label, `.example.com` also matches `example.com` itself, and
+    an exact name beats either. Among patterns the longest suffix wins. A lookup
+    walks at most one node per label of the hostname, whatever the number of
+    patterns.
+    """
+
+    __slots__ = ("children", "exact", "wildcard", "suffix")
+
+    def __init__(self):
+        self.children: dict[str, HostnameTrie] = {}
+        self.exact = None
+        self.wildcard = None
+        self.suffix = None
+
+    def insert(self, pattern: str, value):
+        """Add an exact name or pattern and return the stored value; the first one inserted for a pattern is kept."""
+
+        s = normalize_public_hostname(pattern)
+        kind = "exact"
+
+        if s.startswith("*."):
+            s, kind = s[2:], "wildcard"
+        elif s.startswith("."):
+            s, kind = s[1:], "suffix"
+
+        node = self
+        for label in reversed(s.split(".")):
+            node = node.children.setdefault(label, HostnameTrie())
+
+        if getattr(node, kind) is None:
+            setattr(node, kind, value)
+
+        return getattr(node, kind)
+
+    def lookup(self, hostname: str | None):
+        """Most specific value matching `hostname`, or None."""
+
+        s = normalize_public_hostname(hostname)
+        if not s:
+            return None
+
+        labels = s.split(".")
+        best = None
+        node = self
+
+        for depth, label in enumerate(reversed(labels), start=1):
+
+            node = node.children.get(label)
+            if node is None:
+                return best
+
+            if depth == len(labels):
+                if node.exact is not None:
+                    return node.exact
+                return node.suffix if node.suffix is not None else best
+
+            if node.wildcard is not None:
+                best = node.wildcard
+            elif node.suffix is not None:
+                best = node.suffix
+
+        return best
+
+
+class PathPrefixTree:
+    """Radix tree over path segments resolving the longest matching prefix.
+
+    `/grafana` matches `/grafana`, `/grafana/` and `/grafana/d/abc`, but not
+    `/grafanax`. Each node holds a dict of child segments, so a lookup costs one
+    dict probe per segment of the requested path, however many prefixes the
+    host has.
+    """
+
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: dict[str, PathPrefixTree] = {}
+        self.value = None
+
+    def insert(self, prefix: str, value) -> None:
+        """Add a prefix (`/` for the whole host). The first value inserted for a prefix is kept."""
+
+        node = self
+        for segment in normalize_path(prefix).split("/")[1:]:
+            if segment:
+                node = node.children.setdefault(segment, PathPrefixTree())
+
+        if node.value is None:
+            node.value = value
+
+    def lookup(self, path: str | None):
+        """Value of the longest prefix of `path`, or None."""
+
+        node = self
+        best = node.value
+
+        for segment in (path or "").split("/"):
+
+            if not segment:
+                continue
+
+            node = node.children.get(segment)
+            if node is None:
+                break
+
+            if node.value is not None:
+                best = node.value
+
+        return best
+
+
+class ServiceRoutes:
+    """Host, then longest path prefix, routing of catalog rows.
+
+    The host is resolved the way nginx picks a `server` block: exact name, then
+    the most specific wildcard / suffix pattern (`HostnameTrie`). The path is then
+    resolved within that host only (`PathPrefixTree`), like a `location`.
+    """
+
+    def __init__(self, services: list[dict]):
+        self._exact: dict[str, PathPrefixTree] = {}
+        self._patterns = HostnameTrie()
+
+        for service in services:
+            name = service.get("name")
+            host = normalize_public_hostname(name)
+            if is_hostname_pattern(host):
+                tree = self._patterns.insert(host, PathPrefixTree())
+            else:
+                tree = self._exact.setdefault(host, PathPrefixTree())
+            # First row wins, matching the order of the former linear scan.
+            tree.insert(service_path_prefix(name), service)
+
+    def find(self, host: str | None, path: str | None = "/") -> dict | None:
+        host = normalize_public_hostname(host)
+        if not host:
+            return None
+        tree = self._exact.get(host) or self._patterns.lookup(host)
+        if tree is None:
+            return None
+        return tree.lookup(path)
+
+
 def public_hostname_from_redirect(redirect: str) -> str | None:
     host = urlparse(redirect.strip()).hostname
     if not host:
@@ -26,16 +215,19 @@ def public_hostname_from_redirect(redirect: str) -> str | None:
     return host.lower()
 
 
+def path_from_redirect(redirect: str) -> str:
+    return normalize_path(urlparse(redirect.strip()).path)
+
+
 def find_service_for_redirect(services: list[dict], redirect: str) -> dict | None:
-    """Match a redirect URL to a catalog row by public hostname (`name` only).
+    """Match a redirect URL to a catalog row by public hostname and path prefix (`name` only).
 
-    `internal_address` is the upstream backend target and must not be used here;
-    many services can share the same backend IP or hostname.
+    Exact names win over wildcard / suffix patterns, then the longest path
+    prefix wins (see `ServiceRoutes`). `internal_address` is the upstream backend
+    target and must not be used here; many services can share the same backend
+    IP or hostname.
     """
     redirect_host = public_hostname_from_redirect(redirect)
     if not redirect_host:
         return None
-    for svc in services:
-        if normalize_public_hostname(svc.get("name")) == redirect_host:
-            return svc
-    return None
+    return ServiceRoutes(services).find(redirect_host, path_from_redirect(redirect))
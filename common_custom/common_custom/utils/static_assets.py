@@ -0,0 +1,180 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built.
+    brotli = None
+
+# Vite puts content-hashed bundles here; their URLs change whenever their content does.
+IMMUTABLE_PREFIX = "assets/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/manifest+json", "image/svg+xml", "application/xml")
+MIN_COMPRESS_BYTES = 512
+
+mimetypes.add_type("text/javascript", ".js")
+mimetypes.add_type("text/javascript", ".mjs")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+class StaticAsset:
+    """One file of the build, held in memory with its precompressed variants."""
+
+    __slots__ = ("body", "content_type", "etag", "cache_control", "variants")
+
+    def __init__(self, relative_path: str, body: bytes, precompressed: dict[str, bytes]):
+        content_type = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+
+        if content_type.startswith("text/") or content_type in ("application/json", "application/manifest+json", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+
+        self.body = body
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if relative_path.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+        self.variants: dict[str, bytes] = {}
+
+        if len(body) < MIN_COMPRESS_BYTES or not content_type.startswith(COMPRESSIBLE_TYPES):
+            return
+
+        encoded = {
+            "br": precompressed.get("br") or (brotli.compress(body, quality=11) if brotli is not None else None),
+            "gzip": precompressed.get("gzip") or gzip.compress(body, compresslevel=9, mtime=0),
+        }
+
+        for encoding, data in encoded.items():
+            # Keep a variant only when it actually saves bytes.
+            if data is not None and len(data) < len(body):
+                self.variants[encoding] = data
+
+
+def _accepted_encodings(accept_encoding: str | None) -> set[str]:
+
+    accepted = set()
+
+    for part in (accept_encoding or "").split(","):
+
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+
+        if not token or params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+
+        accepted.add(token)
+
+    return accepted
+
+
+class StaticAssets:
+    """The SPA build (`frontend/dist`), loaded into memory once at startup.
+
+    Every file is read a single time, with gzip (and brotli, when the optional
+    `brotli` package is installed) variants built at load. `.gz` / `.br` files
+    shipped next to an asset by the build are used as-is. Requests are then
+    served from memory with a strong ETag and `Vary: Accept-Encoding`. Hashed
+    files under `assets/` are marked `immutable` for a year, and `index.html`
+    and other files must revalidate (`no-cache`) so deploys show up at once.
+
+    Rebuilding the frontend requires restarting the API to pick up the new files.
+    """
+
+    def __init__(self, root: Path, build_hint: str, strict_prefixes: tuple[str, ...] = ()):
+        self.root = root
+        self.build_hint = build_hint
+        self.strict_prefixes = strict_prefixes
+        self.files: dict[str, StaticAsset] = {}
+        self.loaded = False
+
+    def load(self) -> "StaticAssets":
+
+        files: dict[str, StaticAsset] = {}
+
+        if self.root.is_dir():
+
+            for directory, _, names in os.walk(self.root):
+
+                for name in names:
+
+                    path = Path(directory) / name
+
+                    if name.endswith((".gz", ".br")) and path.with_suffix("").is_file():
+                        continue  # Precompressed variant of another file, attached below.
+
+                    relative_path = path.relative_to(self.root).as_posix()
+                    precompressed = {}
+
+                    for suffix, encoding in ((".br", "br"), (".gz", "gzip")):
+                        variant = path.with_name(name + suffix)
+                        if variant.is_file():
+                            precompressed[encoding] = variant.read_bytes()
+
+                    files[relative_path] = StaticAsset(relative_path, path.read_bytes(), precompressed)
+
+        self.files = files
+        self.loaded = self.root.is_dir()
+
+        return self
+
+    def _asset_for(self, path_within: str) -> StaticAsset:
+
+        if not self.loaded:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Frontend not built. Run: {self.build_hint}",
+            )
+
+        if path_within:
+
+            asset = self.files.get(path_within.strip("/"))
+
+            if asset is not None:
+                return asset
+
+            # Do not fall through to `index.html` for missing Vite bundles under
+            # `assets/` — the browser would mis-parse HTML as JS/CSS.
+            for prefix in self.strict_prefixes:
+                if path_within == prefix or path_within.startswith(prefix + "/"):
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+        index = self.files.get("index.html")
+
+        if index is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Frontend build is incomplete (missing index.html).",
+            )
+
+        return index
+
+    def response(self, path_within: str, accept_encoding: str | None = None, if_none_match: str | None = None) -> Response:
+        """Serve `path_within` (SPA fallback to `index.html`) from memory."""
+
+        asset = self._asset_for(path_within)
+        accepted = _accepted_encodings(accept_encoding)
+
+        encoding = next((encoding for encoding in ("br", "gzip") if encoding in accepted and encoding in asset.variants), None)
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+        }
+
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(content=asset.variants[encoding], media_type=asset.content_type, headers=headers)
+
+        return Response(content=asset.body, media_type=asset.content_type, headers=headers)
@@ -0,0 +1,245 @@
+import os
+import time
+import asyncio
+import httpx
+from pathlib import Path
+from dotenv import load_dotenv
+from urllib.parse import urlsplit
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # Optional: without it every destination is spoken to over HTTP/1.1.
+    HTTP2_AVAILABLE = False
+
+DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
+
+load_dotenv(DATA_DIR / ".env")
+
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", 10))
+WEBHOOK_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEBHOOK_MAX_CONNECTIONS_PER_HOST", 4))
+WEBHOOK_KEEPALIVE_SECONDS = float(os.getenv("WEBHOOK_KEEPALIVE_SECONDS", 60))
+WEBHOOK_CIRCUIT_FAILURES = int(os.getenv("WEBHOOK_CIRCUIT_FAILURES", 5))
+WEBHOOK_CIRCUIT_RESET_SECONDS = float(os.getenv("WEBHOOK_CIRCUIT_RESET_SECONDS", 30))
+WEBHOOK_HTTP2 = os.getenv("WEBHOOK_HTTP2") != 'False'
+
+# Upper bounds (seconds) of the per-destination latency histogram buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending while a destination's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: `closed` → `open` → `half_open` → `closed`.
+
+    After `failure_threshold` failures in a row the breaker opens and rejects
+    requests for `reset_seconds`. Then a single trial request is let through;
+    its success closes the breaker and its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+
+        if self.state == "closed" or self.failure_threshold <= 0:
+            return True
+
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+
+        self.failures += 1
+        self._trial_in_flight = False
+
+        if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram in the Prometheus bucket layout."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+
+        self.count += 1
+        self.sum += seconds
+
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+
+    def snapshot(self) -> dict:
+        buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 6)}
+
+
+class Destination:
+    """Connection pool, concurrency limit, breaker and counters of one `scheme://host:port`."""
+
+    def __init__(self, client: httpx.AsyncClient, max_connections: int, breaker: CircuitBreaker):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.breaker = breaker
+        self.latency = LatencyHistogram()
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "latency_seconds": self.latency.snapshot(),
+        }
+
+
+def destination_key(url: str) -> str:
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "http").lower()
+    port = parts.port or (443 if scheme == "https" else 80)
+    return f"{scheme}://{(parts.hostname or '').lower()}:{port}"
+
+
+class WebhookClient:
+    """Shared async HTTP client for webhook delivery.
+
+    Every destination (`scheme://host:port`) gets its own `httpx.AsyncClient`,
+    so connections are kept alive and reused between deliveries, and HTTP/2 is
+    negotiated when the optional `h2` package is installed. At most
+    `max_connections_per_host` requests run at once per destination, and a
+    per-destination `CircuitBreaker` makes deliveries to a host that keeps
+    failing (connection errors, timeouts, `5xx`) fail fast with
+    `CircuitOpenError` until it is probed again.
+
+    Destinations are created lazily on the running event loop; `aclose()` closes
+    their pools and must be awaited on shutdown.
+    """
+
+    def __init__(
+        self,
+        timeout: float = WEBHOOK_TIMEOUT,
+        max_connections_per_host: int = WEBHOOK_MAX_CONNECTIONS_PER_HOST,
+        keepalive_seconds: float = WEBHOOK_KEEPALIVE_SECONDS,
+        circuit_failures: int = WEBHOOK_CIRCUIT_FAILURES,
+        circuit_reset_seconds: float = WEBHOOK_CIRCUIT_RESET_SECONDS,
+        http2: bool = WEBHOOK_HTTP2 and HTTP2_AVAILABLE,
+    ):
+        self.timeout = timeout
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.keepalive_seconds = keepalive_seconds
+        self.circuit_failures = circuit_failures
+        self.circuit_reset_seconds = circuit_reset_seconds
+        self.http2 = http2
+        self._destinations: dict[str, Destination] = {}
+
+    def _destination(self, key: str) -> Destination:
+
+        destination = self._destinations.get(key)
+
+        if destination is None:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections_per_host,
+                    max_keepalive_connections=self.max_connections_per_host,
+                    keepalive_expiry=self.keepalive_seconds,
+                ),
+            )
+            destination = Destination(
+                client,
+                self.max_connections_per_host,
+                CircuitBreaker(self.circuit_failures, self.circuit_reset_seconds),
+            )
+            self._destinations[key] = destination
+
+        return destination
+
+    async def request(self, method: str, url: str, headers: dict | None = None, params: dict | None = None, cookies: dict | None = None, json=None) -> httpx.Response:
+
+        destination = self._destination(destination_key(url))
+
+        if not destination.breaker.allow():
+            destination.rejected += 1
+            raise CircuitOpenError(f"Circuit open for {destination_key(url)}")
+
+        headers = dict(headers or {})
+
+        if cookies:
+            # Sent as a header: per-request cookie jars are deprecated in httpx.
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+        async with destination.semaphore:
+
+            destination.in_flight += 1
+            destination.requests += 1
+            started = time.perf_counter()
+
+            try:
+                response = await destination.client.request(method, url, headers=headers, params=params, json=json)
+            except httpx.HTTPError:
+                destination.failures += 1
+                destination.breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled (e.g. on shutdown): no verdict on the destination.
+                destination.breaker.release_trial()
+                raise
+            finally:
+                destination.in_flight -= 1
+                destination.latency.observe(time.perf_counter() - started)
+
+        if response.status_code >= 500:
+            destination.failures += 1
+            destination.breaker.record_failure()
+        else:
+            destination.breaker.record_success()
+
+        return response
+
+    def stats(self) -> dict[str, dict]:
+        return {key: destination.stats() for key, destination in self._destinations.items()}
+
+    async def aclose(self) -> None:
+
+        destinations, self._destinations = self._destinations, {}
+
+        for destination in destinations.values():
+            await destination.client.aclose()
+
+
+webhook_client = WebhookClient()
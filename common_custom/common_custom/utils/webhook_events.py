@@ -2,20 +2,35 @@ import os
 import time
 from pathlib import Path
 from dotenv import load_dotenv
-from common_custom.controllers.database import Database
-from common_custom.utils.pydantic.webhook_models import HTTPRequest, WebhookValidator
+from common_custom.controllers.database import database as mongodb_helper
+from common_custom.utils.webhook_outbox import WebhookOutbox
+from common_custom.utils.webhook_registry import WebhookRegistry
+from common_custom.utils.service_catalog import ServiceCatalog
 from common_custom.controllers.pydantic.allowed_models import AllowedConnectionModel
+from common_custom.utils.logger import create_logger
 
 DATA_DIR = (Path(__file__).resolve().parents[3] / "data").resolve()
 
 load_dotenv(DATA_DIR / ".env")
 
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or str(DATA_DIR / "app.db")
+log = create_logger(alias="Events", logger_name="common_custom.events")
+
+webhook_registry = WebhookRegistry(mongodb_helper)
+service_catalog = ServiceCatalog(mongodb_helper)
+
+# Events only queue deliveries; the API lifespan starts and drains the workers.
+webhook_outbox = WebhookOutbox(
+    mongodb_helper,
+    workers=int(os.getenv("WEBHOOK_WORKERS", 4)),
+    max_attempts=int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 8)),
+    retry_base_seconds=float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", 5)),
+    retry_max_seconds=float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", 3600)),
+    poll_interval=float(os.getenv("WEBHOOK_POLL_INTERVAL", 5)),
+    lease_seconds=float(os.getenv("WEBHOOK_LEASE_SECONDS", 60)),
+    drain_timeout=float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 10)),
+    digest_max_batch=int(os.getenv("WEBHOOK_DIGEST_MAX_BATCH", 25)),
 )
 
-mongodb_helper.connect()
-
 
 class Events:
 
@@ -49,15 +64,35 @@ class Events:
         return context
 
     @staticmethod
-    async def pending_new(access_request, remote_address: str, service):
+    async def _matching_webhooks(event: str, service_name: str | None):
+
+        service = await service_catalog.get(service_name)
+        category = service.get("category") if service else None
+
+        return await webhook_registry.matching(event, service_name, category)
+
+    @staticmethod
+    async def _enqueue(webhooks: list, context: dict) -> list[str]:
+        """Queue one delivery per webhook; the outbox workers send them concurrently."""
+
+        delivery_ids = []
+
+        for webhook in webhooks:
+
+            delivery_id = await webhook_outbox.enqueue(webhook.request, context)
+
+            log.debug(f"Webhook '{webhook.request.event}' ({webhook.request.name or webhook.request.id}) queued as {delivery_id}")
+
+            delivery_ids.append(delivery_id)
+
+        return delivery_ids
 
-        webhook_available = await mongodb_helper.get_webhook(event="pending.new")
+    @staticmethod
+    async def pending_new(access_request, remote_address: str, service):
 
-        if webhook_available:
+        webhooks = await Events._matching_webhooks("pending.new", service.name)
 
-            webhook_request = HTTPRequest(
-                **webhook_available
-            )
+        if webhooks:
 
             # Available message variables: {{ip_address}}, {{service}}, {{note}}, {{date}}, {{time}} {{time_seconds}}, {{nl}}
 
@@ -71,23 +106,14 @@ class Events:
 
             context.update(additional_context)
 
-            response = await WebhookValidator.execute_webhook(webhook_request, context)
-
-            print(f"Webhook invoked with status code: {response.status_code}")
-            print(f"Response content: {response.text}")
-
-            return response
+            return await Events._enqueue(webhooks, context)
 
     @staticmethod
     async def pending_accepted(allowed_connection_payload: AllowedConnectionModel):
 
-        webhook_available = await mongodb_helper.get_webhook(event="pending.accepted")
-
-        if webhook_available:
+        webhooks = await Events._matching_webhooks("pending.accepted", allowed_connection_payload.service_name)
 
-            webhook_request = HTTPRequest(
-                **webhook_available
-            )
+        if webhooks:
 
             context = await Events.default_context(allowed_connection_payload.contact_methods.name, allowed_connection_payload.contact_methods.phone_number, allowed_connection_payload.contact_methods.email)
 
@@ -103,49 +129,33 @@ class Events:
 
             context.update(additional_context)
 
-            response = await WebhookValidator.execute_webhook(webhook_request, context)
-
-            print(f"Webhook invoked with status code: {response.status_code}")
-            print(f"Response content: {response.text}")
-
-            return response
+            return await Events._enqueue(webhooks, context)
 
     @staticmethod
     async def pending_denied(pending_connection):
 
-        webhook_available = await mongodb_helper.get_webhook(event="pending.denied")
+        service_name = pending_connection.get("service", {}).get("name", "Unknown")
 
-        if webhook_available:
+        webhooks = await Events._matching_webhooks("pending.denied", service_name)
 
-            webhook_request = HTTPRequest(
-                **webhook_available
-            )
+        if webhooks:
 
             context = await Events.default_context(pending_connection.get("contact_methods", {}).get("name", {}), pending_connection.get("contact_methods", {}).get("phone_number", {}), pending_connection.get("contact_methods", {}).get("email", {}))
 
             additional_context = {
-                "service": pending_connection.get("service", {}).get("name", "Unknown"),
+                "service": service_name,
             }
 
             context.update(additional_context)
 
-            response = await WebhookValidator.execute_webhook(webhook_request, context)
-
-            print(f"Webhook invoked with status code: {response.status_code}")
-            print(f"Response content: {response.text}")
-
-            return response
+            return await Events._enqueue(webhooks, context)
 
     @staticmethod
     async def connection_revoked(document_payload: dict):
 
-        webhook_available = await mongodb_helper.get_webhook(event="connection.revoked")
+        webhooks = await Events._matching_webhooks("connection.revoked", document_payload.get("service_name"))
 
-        if webhook_available:
-
-            webhook_request = HTTPRequest(
-                **webhook_available
-            )
+        if webhooks:
 
             context = await Events.default_context(document_payload.get("contact_methods", {}).get("name", {}), document_payload.get("contact_methods", {}).get("phone_number", {}), document_payload.get("contact_methods", {}).get("email", {}))
 
@@ -155,9 +165,4 @@ class Events:
 
             context.update(additional_context)
 
-            response = await WebhookValidator.execute_webhook(webhook_request, context)
-
-            print(f"Webhook invoked with status code: {response.status_code}")
-            print(f"Response content: {response.text}")
-
-            return response
+            return await Events._enqueue(webhooks, context)
@@ -0,0 +1,274 @@
+import random
+import asyncio
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from pydantic import ValidationError
+from common_custom.controllers.database import Database
+from common_custom.utils.pydantic.webhook_models import HTTPRequest, WebhookValidator
+from common_custom.utils.logger import create_logger
+
+log = create_logger(alias="Outbox", logger_name="common_custom.outbox")
+
+# Statuses worth another attempt; any other 4xx means the webhook itself is wrong.
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+# Digest variables joining one field of every merged event: plural name -> field.
+DIGEST_JOINED_FIELDS = {"services": "service", "ip_addresses": "ip_address", "names": "name"}
+
+
+def _retry_after_seconds(response) -> float:
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def digest_context(context: dict | list[dict] | None) -> dict:
+    """List-aware template context of a delivery, whether it carries one event or a digest.
+
+    The first event's variables stay available as-is, so templates written for a
+    single event keep working. `events` is the list of every merged event's
+    variables and `count` its length. `services`, `ip_addresses` and `names` join
+    the distinct values of those fields with `, `.
+    """
+
+    events = context if isinstance(context, list) else [context or {}]
+    merged = dict(events[0]) if events else {}
+
+    merged["events"] = events
+    merged["count"] = len(events)
+
+    for plural, field in DIGEST_JOINED_FIELDS.items():
+        values = dict.fromkeys(str(event[field]) for event in events if event.get(field))
+        merged[plural] = ", ".join(values)
+
+    return merged
+
+
+def digest_batch_key(request: HTTPRequest) -> str:
+    """Events are merged only with others for the same webhook definition."""
+    return f"{request.event}:{hashlib.sha1(request.model_dump_json().encode()).hexdigest()[:16]}"
+
+
+class WebhookOutbox:
+    """Durable, asynchronous webhook delivery backed by the `webhook_outbox` table.
+
+    Request handlers only insert a row (`enqueue`) and return. A pool of worker
+    tasks on the event loop claims due rows with a lease, renders and sends them,
+    and deletes them on success. Failures are retried with exponential backoff
+    and jitter; after `max_attempts`, or on a non-retryable `4xx`, the row is
+    kept with status `dead` as a dead-letter entry that an admin can requeue.
+
+    A webhook with `digest_seconds` set is sent as a digest: the first event
+    opens a row due that many seconds later, and events arriving meanwhile are
+    appended to it (up to `digest_max_batch`, then a new digest starts), so a
+    burst costs one request instead of one per event.
+
+    Rows survive restarts, and several processes may run workers on the same
+    database: a claim is a single `UPDATE`, and a lease left by a crashed worker
+    simply expires. `stop()` lets the workers drain what is already due before
+    the process exits; anything left is picked up on the next start.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        workers: int = 2,
+        max_attempts: int = 8,
+        retry_base_seconds: float = 5.0,
+        retry_max_seconds: float = 3600.0,
+        poll_interval: float = 5.0,
+        lease_seconds: float = 60.0,
+        drain_timeout: float = 10.0,
+        digest_max_batch: int = 25,
+    ):
+        self._database = database
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.drain_timeout = drain_timeout
+        self.digest_max_batch = digest_max_batch
+
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._draining = False
+
+    async def enqueue(self, request: HTTPRequest, context: dict) -> str:
+
+        if request.digest_seconds:
+            delivery_id = await self._database.enqueue_webhook_delivery(
+                request,
+                context,
+                digest_seconds=request.digest_seconds,
+                digest_max_batch=request.digest_max_batch or self.digest_max_batch,
+                batch_key=digest_batch_key(request),
+            )
+        else:
+            delivery_id = await self._database.enqueue_webhook_delivery(request, context)
+
+        # Idle workers re-plan their sleep around the new row (a digest is due when its window closes).
+        self.notify()
+        return delivery_id
+
+    def notify(self) -> None:
+        """Wake idle workers of this process; other processes notice new rows on their next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def requeue(self, delivery_id: str) -> dict | None:
+        delivery = await self._database.requeue_webhook_dead_letter(delivery_id)
+        if delivery is not None:
+            self.notify()
+        return delivery
+
+    async def start(self) -> None:
+
+        if self._tasks or self.workers <= 0:
+            return
+
+        self._draining = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{number}")
+            for number in range(self.workers)
+        ]
+
+        for task in self._tasks:
+            task.add_done_callback(self._on_worker_done)
+
+        log.info(f"Started {self.workers} webhook delivery worker(s)")
+
+    async def stop(self) -> None:
+        """Deliver everything already due, for up to `drain_timeout` seconds, then stop the workers."""
+
+        if not self._tasks:
+            return
+
+        self._draining = True
+        self.notify()
+
+        tasks, self._tasks = self._tasks, []
+        _, still_running = await asyncio.wait(tasks, timeout=self.drain_timeout)
+
+        for task in still_running:
+            task.cancel()
+
+        if still_running:
+            await asyncio.gather(*still_running, return_exceptions=True)
+            log.warning(f"Webhook outbox not fully drained after {self.drain_timeout}s; remaining deliveries resume on next start")
+
+        self._wakeup = None
+
+    async def stats(self) -> dict[str, int]:
+        counts = await self._database.count_webhook_deliveries()
+        counts["workers"] = sum(not task.done() for task in self._tasks)
+        return counts
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _idle_timeout(self) -> float:
+
+        next_due = await self._database.next_webhook_delivery_at()
+
+        if next_due is None:
+            return self.poll_interval
+
+        until_due = (next_due - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+        return min(self.poll_interval, max(0.05, until_due))
+
+    def _on_worker_done(self, task: asyncio.Task) -> None:
+
+        if task.cancelled():
+            log.debug(f"{task.get_name()} cancelled")
+        elif task.exception() is not None:
+            log.error(f"{task.get_name()} stopped: {task.exception()!r}", exc_info=task.exception())
+        elif not self._draining:
+            log.warning(f"{task.get_name()} exited while the outbox was running")
+        else:
+            log.debug(f"{task.get_name()} drained")
+
+    async def _worker(self) -> None:
+
+        while True:
+
+            try:
+                if not await self._work_once():
+                    return
+            except Exception:
+                # Any failure (database, a bug in delivery) is logged and retried; a dead
+                # worker would leave due deliveries waiting until the next restart.
+                log.exception("Webhook delivery worker iteration failed")
+
+                if self._draining:
+                    return
+
+                await asyncio.sleep(self.poll_interval)
+
+    async def _work_once(self) -> bool:
+        """Claim and deliver one due row, or wait for new work. Returns False once drained."""
+
+        # Cleared before claiming, so an enqueue racing with an empty claim still wakes us.
+        self._wakeup.clear()
+
+        try:
+            delivery = await self._database.claim_webhook_delivery(self.lease_seconds)
+        except sqlite3.OperationalError as e:
+            # Another process holds the write lock; try again shortly.
+            log.debug(f"Could not claim a webhook delivery: {e}")
+            delivery = None
+
+        if delivery is not None:
+            await self._deliver(delivery)
+            return True
+
+        if self._draining:
+            return False
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=await self._idle_timeout())
+        except asyncio.TimeoutError:
+            pass
+
+        return True
+
+    async def _deliver(self, delivery: dict) -> None:
+
+        delivery_id = delivery["_id"]
+        attempts = delivery["attempts"]
+
+        try:
+            request = HTTPRequest(**delivery["request"])
+        except ValidationError as e:
+            await self._database.dead_letter_webhook_delivery(delivery_id, f"Invalid webhook request: {e}")
+            log.error(f"Dead-lettered webhook delivery {delivery_id}: invalid request")
+            return
+
+        response = await WebhookValidator.execute_webhook(request, digest_context(delivery["context"]))
+
+        if response is not None and response.status_code < 400:
+            await self._database.complete_webhook_delivery(delivery_id)
+            log.info(f"Webhook '{request.event}' ({delivery['batch_size']} event(s)) delivered with status code: {response.status_code}")
+            log.debug(f"Response content: {response.text}")
+            return
+
+        if response is None:
+            error, retryable, delay = "No response (timeout, connection or rendering failure)", True, 0.0
+        else:
+            error = f"HTTP {response.status_code}"
+            retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS_CODES
+            delay = _retry_after_seconds(response)
+
+        if not retryable or attempts >= self.max_attempts:
+            await self._database.dead_letter_webhook_delivery(delivery_id, error)
+            log.error(f"Dead-lettered webhook '{request.event}' ({delivery_id}) after {attempts} attempt(s): {error}")
+            return
+
+        delay = min(self.retry_max_seconds, max(delay, self._backoff(attempts)))
+        await self._database.retry_webhook_delivery(delivery_id, delay, error)
+        log.warning(f"Webhook '{request.event}' attempt {attempts} failed ({error}); retrying in {delay:.0f}s")
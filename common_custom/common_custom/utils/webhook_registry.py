@@ -0,0 +1,62 @@
+from pydantic import ValidationError
+from common_custom.controllers.database import Database
+from common_custom.utils.pydantic.webhook_models import HTTPRequest, CompiledWebhook
+from common_custom.utils.logger import create_logger
+
+log = create_logger(alias="Webhooks", logger_name="common_custom.webhooks")
+
+
+class WebhookRegistry:
+    """In-process snapshot of the `webhooks` table, compiled for rendering.
+
+    Each enabled webhook is validated into an `HTTPRequest` and its template
+    tree compiled (`CompiledWebhook`) once per definition, so firing an event
+    costs a dict lookup and a filter check per webhook of that event, instead
+    of a query, a model rebuild and a Jinja compile per string.
+
+    Refreshes follow `ServiceCatalog`: `Database.data_version()` on every
+    access, then `Database.webhooks_revision()` only when it moved, and a
+    rebuild only when a webhook was created, modified or deleted by any process.
+    """
+
+    def __init__(self, database: Database):
+        self._database = database
+        self._version: tuple[int, int] | None = None
+        self._revision: int | None = None
+        self._webhooks: dict[str, list[CompiledWebhook]] = {}
+
+    async def _refresh(self) -> None:
+
+        version = self._database.data_version()
+
+        if version == self._version:
+            return
+
+        revision = self._database.webhooks_revision()
+
+        if revision != self._revision:
+
+            webhooks: dict[str, list[CompiledWebhook]] = {}
+
+            for document in await self._database.list_webhooks():
+
+                if not document.get("enabled", True):
+                    continue
+
+                try:
+                    compiled = CompiledWebhook.for_request(HTTPRequest(**document))
+                except ValidationError as e:
+                    log.error(f"Skipping invalid webhook {document.get('_id')} for event '{document.get('event')}': {e}")
+                    continue
+
+                webhooks.setdefault(document["event"], []).append(compiled)
+
+            self._webhooks = webhooks
+            self._revision = revision
+
+        self._version = version
+
+    async def matching(self, event: str, service: str | None = None, category: str | None = None) -> list[CompiledWebhook]:
+        """Enabled webhooks of `event` whose service and category filters let this event through."""
+        await self._refresh()
+        return [webhook for webhook in self._webhooks.get(event, ()) if webhook.matches(service, category)]
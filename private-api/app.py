@@ -2,13 +2,18 @@ import os
 import time
 import uvicorn
 from pathlib import Path
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request, Depends, status, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, Depends
+from fastapi.responses import Response
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from routes import service, auth, pending, connection, webhook, config
 from models.auth_models import oauth2_token_scheme
 from common_custom.utils.pydantic.health_models import StatusResponseModel
+from common_custom.utils.static_assets import StaticAssets
+from common_custom.controllers.database import database
+from common_custom.utils.webhook_events import webhook_outbox
+from common_custom.utils.webhook_client import webhook_client
 
 _HERE = Path(__file__).resolve().parent
 DATA_DIR = (_HERE.parent / "data").resolve()
@@ -19,9 +24,24 @@ load_dotenv(DATA_DIR / "private.env")
 SERVICE_VERSION = os.getenv("SERVICE_VERSION")
 SERVICE_UNDER_MAINTENANCE = os.getenv("SERVICE_UNDER_MAINTENANCE") == 'True'
 
+# Uvicorn worker processes; each opens its own database connection in the lifespan.
+PRIVATE_API_WORKERS = int(os.getenv("PRIVATE_API_WORKERS", 1))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    database.connect()
+    await webhook_outbox.start()
+    yield
+    await webhook_outbox.stop()
+    await webhook_client.aclose()
+    database.close()
+
 
 app = FastAPI(
     title="Reverse-Proxy-Access-Control-Manager",
+    lifespan=lifespan,
 )
 
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])
@@ -88,37 +108,30 @@ app.include_router(
 STATIC_ROOT = (_HERE / "frontend" / "dist").resolve()
 
 
-def _frontend_file_response(path_within: str) -> FileResponse:
-    if not STATIC_ROOT.is_dir():
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Frontend not built. Run: cd private-api/frontend && npm install && npm run build",
-        )
-    if path_within:
-        candidate = (STATIC_ROOT / path_within).resolve()
-        try:
-            candidate.relative_to(STATIC_ROOT)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-        if candidate.is_file():
-            return FileResponse(candidate)
-    index = STATIC_ROOT / "index.html"
-    if not index.is_file():
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Frontend build is incomplete (missing index.html).",
-        )
-    return FileResponse(index)
+# Loaded once; every portal request is then served from memory.
+static_assets = StaticAssets(
+    STATIC_ROOT,
+    build_hint="cd private-api/frontend && npm install && npm run build",
+    strict_prefixes=(),
+).load()
+
+
+def _frontend_file_response(path_within: str, request: Request) -> Response:
+    return static_assets.response(
+        path_within,
+        accept_encoding=request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match"),
+    )
 
 
 @app.get("/", include_in_schema=False)
-async def admin_portal_index():
-    return _frontend_file_response("")
+async def admin_portal_index(request: Request):
+    return _frontend_file_response("", request)
 
 
 @app.get("/{full_path:path}", include_in_schema=False)
-async def admin_portal_static(full_path: str):
-    return _frontend_file_response(full_path)
+async def admin_portal_static(full_path: str, request: Request):
+    return _frontend_file_response(full_path, request)
 
 
 # Tags for API documentation
@@ -146,4 +159,10 @@ async def admin_portal_static(full_path: str):
 
 if __name__ == "__main__":
 
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # Several workers need the import string: each process imports the app itself.
+    uvicorn.run(
+        "app:app" if PRIVATE_API_WORKERS > 1 else app,
+        host="0.0.0.0",
+        port=8001,
+        workers=PRIVATE_API_WORKERS,
+    )
@@ -1,10 +1,8 @@
-import os
-from pathlib import Path
 from datetime import datetime, timezone
-from dotenv import load_dotenv
 from common_custom.utils.webhook_events import Events
+from common_custom.utils.geoip import geoip
 from fastapi import APIRouter, status
-from common_custom.controllers.database import Database
+from common_custom.controllers.database import database as mongodb_helper
 from common_custom.controllers.validators import MongoID
 from common_custom.controllers.pydantic.allowed_models import (
     AdminCreateAllowedConnectionRequestModel,
@@ -13,16 +11,6 @@ from common_custom.controllers.pydantic.allowed_models import (
     DeniedConnectionModel,
 )
 
-DATA_DIR = (Path(__file__).resolve().parents[2] / "data").resolve()
-
-load_dotenv(DATA_DIR / ".env")
-
-
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or str(DATA_DIR / "app.db")
-)
-
-mongodb_helper.connect()
 
 services = mongodb_helper.services_collection_name
 allowed_connections = mongodb_helper.allowed_collection_name
@@ -73,6 +61,7 @@ async def create_allowed_connection(body: AdminCreateAllowedConnectionRequestMod
         contact_methods=contact,
         expiry_minutes=body.expiry_minutes if body.expire_at is None else None,
         expire_at=body.expire_at,
+        geo=geoip.lookup(str(body.ip_address)),
     )
 
 
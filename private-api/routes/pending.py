@@ -1,10 +1,7 @@
-import os
-from pathlib import Path
-from dotenv import load_dotenv
 from fastapi import APIRouter, status, Body
 from typing import Optional
 from common_custom.utils.webhook_events import Events
-from common_custom.controllers.database import Database
+from common_custom.controllers.database import database as mongodb_helper
 from common_custom.controllers.validators import MongoID
 from common_custom.controllers.pydantic.allowed_models import AllowedConnectionModel, DeniedSuccessResponseModel
 from common_custom.controllers.pydantic.pending_models import (
@@ -13,16 +10,6 @@ from common_custom.controllers.pydantic.pending_models import (
     AcceptPendingConnectionRequestModel,
 )
 
-DATA_DIR = (Path(__file__).resolve().parents[2] / "data").resolve()
-
-load_dotenv(DATA_DIR / ".env")
-
-
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or str(DATA_DIR / "app.db")
-)
-
-mongodb_helper.connect()
 
 router = APIRouter(
     prefix="/pending",
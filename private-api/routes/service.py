@@ -1,21 +1,10 @@
-import os
-from dotenv import load_dotenv
 from typing import Literal, Optional  # NOQA: F401
 from fastapi import APIRouter, status, HTTPException, Request, Depends, Form, Path  # NOQA: F401
 from pydantic import BaseModel, Field, IPvAnyAddress, BeforeValidator, AfterValidator  # NOQA: F401
-from common_custom.controllers.database import Database
+from common_custom.controllers.database import database as mongodb_helper
 from common_custom.controllers.pydantic.service_models import ServiceResponseModel
+from common_custom.utils.service_matching import is_valid_hostname_pattern
 
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
-
-load_dotenv(os.path.join(DATA_DIR, ".env"))
-
-
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or os.path.join(DATA_DIR, "app.db")
-)
-
-mongodb_helper.connect()
 
 router = APIRouter(
     prefix="/service",
@@ -68,6 +57,13 @@ async def service_create(
     service: ServiceResponseModel
 ):
 
+    if not is_valid_hostname_pattern(service.name):
+
+        raise HTTPException(
+            status_code=422,
+            detail="Wildcard service names must look like *.apps.example.com or .example.com"
+        )
+
     service_found = await mongodb_helper.get_service(service_name=service.name)
 
     if service_found:
@@ -98,6 +94,13 @@ async def service_edit(
     service_name: str = Path(..., max_length=200),
 ):
 
+    if service.name and not is_valid_hostname_pattern(service.name):
+
+        raise HTTPException(
+            status_code=422,
+            detail="Wildcard service names must look like *.apps.example.com or .example.com"
+        )
+
     service_found = await mongodb_helper.get_service(service_name=service_name)
 
     if not service_found:
@@ -1,29 +1,22 @@
-import os
-from dotenv import load_dotenv
 from typing import Literal, Optional  # NOQA: F401
 from fastapi import APIRouter, status, HTTPException, Request, Depends, Form, Path  # NOQA: F401
 from pydantic import BaseModel, Field, IPvAnyAddress, BeforeValidator, AfterValidator  # NOQA: F401
-from common_custom.controllers.database import Database
+from common_custom.controllers.database import database as mongodb_helper
+from common_custom.controllers.validators import MongoID
+from common_custom.utils.webhook_events import webhook_outbox
+from common_custom.utils.webhook_client import webhook_client
 from common_custom.utils.pydantic.webhook_models import (
     HTTPRequest,
     CreateWebhookResponseModel,
     DeleteWebhookRequestModel,
     DeleteWebhookResponseModel,
     ModifyWebhookRequestModel,
-    ModifyWebhookResponseModel
+    ModifyWebhookResponseModel,
+    WebhookDeliveryModel,
+    WebhookOutboxStatsModel,
+    WebhookDestinationStatsModel
 )
 
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
-
-load_dotenv(os.path.join(DATA_DIR, ".env"))
-
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or os.path.join(DATA_DIR, "app.db")
-)
-
-mongodb_helper.connect()
-
-webhooks_collection = mongodb_helper.webhooks_collection_name
 
 router = APIRouter(
     prefix="/webhook",
@@ -32,6 +25,38 @@ router = APIRouter(
 )
 
 
+async def find_webhook(event: str, webhook_id: str | None) -> dict:
+    """The webhook named by `webhook_id`, or the only webhook of `event` when no ID is given."""
+
+    if webhook_id is not None:
+
+        event_document = await mongodb_helper.get_webhook(webhook_id)
+
+        if not event_document or event_document.get("event") != event:
+            raise HTTPException(
+                detail="No webhook found with this id for this event.",
+                status_code=status.HTTP_404_NOT_FOUND
+            )
+
+        return event_document
+
+    event_documents = await mongodb_helper.list_webhooks(event=event)
+
+    if not event_documents:
+        raise HTTPException(
+            detail="No webhook found for this event.",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    if len(event_documents) > 1:
+        raise HTTPException(
+            detail="This event has several webhooks, pass the id of the one to change.",
+            status_code=status.HTTP_409_CONFLICT
+        )
+
+    return event_documents[0]
+
+
 @router.get(
     "/get-webhook-list",
     summary="Show all of the notification events & how they are handled",
@@ -40,7 +65,7 @@ router = APIRouter(
 )
 async def get_all_webhooks():
 
-    webhook_documents = await mongodb_helper.get_all_documents(table_name=webhooks_collection)
+    webhook_documents = await mongodb_helper.list_webhooks()
 
     return webhook_documents
 
@@ -53,21 +78,14 @@ async def get_all_webhooks():
 )
 async def create_webhook(request_payload: HTTPRequest):
 
-    event_document = await mongodb_helper.get_webhook(event=request_payload.event)
-
-    if event_document:
-        raise HTTPException(
-            detail="This event already has a request setup, it cannot be created again.",
-            status_code=status.HTTP_409_CONFLICT
-        )
-
-    await mongodb_helper.create_webhook_request(request_payload)
+    created_document = await mongodb_helper.create_webhook_request(request_payload)
 
     return CreateWebhookResponseModel(
-        **request_payload.model_dump(),
+        **created_document,
         message="The webhook has been successfully created!"
     )
 
+
 @router.delete(
     "/remove-webhook",
     summary="Remove a webhook for a specific event",
@@ -76,17 +94,12 @@ async def create_webhook(request_payload: HTTPRequest):
 )
 async def remove_webhook(request_payload: DeleteWebhookRequestModel):
 
-    event_document = await mongodb_helper.get_webhook(event=request_payload.event)
-
-    if not event_document:
-        raise HTTPException(
-            detail="No webhook found for this event.",
-            status_code=status.HTTP_404_NOT_FOUND
-        )
+    event_document = await find_webhook(request_payload.event, request_payload.id)
 
-    await mongodb_helper.delete_webhook(event=request_payload.event)
+    await mongodb_helper.delete_webhook(event_document["_id"])
 
     return DeleteWebhookResponseModel(
+        _id=event_document["_id"],
         event=request_payload.event,
         message="The webhook has been successfully deleted!"
     )
@@ -100,29 +113,88 @@ async def remove_webhook(request_payload: DeleteWebhookRequestModel):
 )
 async def modify_webhook(request_payload: ModifyWebhookRequestModel):
 
-    event_document = await mongodb_helper.get_webhook(event=request_payload.event)
-
-    if not event_document:
-        raise HTTPException(
-            detail="No webhook found for this event.",
-            status_code=status.HTTP_404_NOT_FOUND
-        )
+    event_document = await find_webhook(request_payload.event, request_payload.id)
 
-    # Extract only the fields that should be updated (exclude event as it's the identifier)
-    update_fields = request_payload.model_dump(exclude={"event"}, exclude_none=True)
+    # Extract only the fields that should be updated (event and id identify the webhook)
+    update_fields = request_payload.model_dump(exclude={"event", "id"}, exclude_none=True)
 
     updated_document = await mongodb_helper.modify_webhook(
-        event=request_payload.event,
+        webhook_id=event_document["_id"],
         update_fields=update_fields
     )
 
     return ModifyWebhookResponseModel(
-        event=updated_document.get("event"),
-        method=updated_document.get("method"),
-        url=updated_document.get("url"),
-        headers=updated_document.get("headers"),
-        query_params=updated_document.get("query_params"),
-        cookies=updated_document.get("cookies"),
-        body=updated_document.get("body"),
+        **updated_document,
         message="The webhook has been successfully modified!"
-    )
\ No newline at end of file
+    )
+
+
+@router.get(
+    "/outbox",
+    summary="Show how many webhook deliveries are queued, in flight and dead-lettered",
+    status_code=status.HTTP_200_OK,
+    response_model=WebhookOutboxStatsModel
+)
+async def get_outbox_stats():
+
+    return await webhook_outbox.stats()
+
+
+@router.get(
+    "/destinations",
+    summary="Show connection, circuit breaker and latency stats per webhook destination",
+    status_code=status.HTTP_200_OK,
+    response_model=dict[str, WebhookDestinationStatsModel]
+)
+async def get_destination_stats():
+
+    return webhook_client.stats()
+
+
+@router.get(
+    "/dead-letters",
+    summary="Show webhook deliveries that failed permanently",
+    status_code=status.HTTP_200_OK,
+    response_model=list[WebhookDeliveryModel]
+)
+async def get_dead_letters():
+
+    return await mongodb_helper.list_webhook_dead_letters()
+
+
+@router.post(
+    "/dead-letters/{id}/retry",
+    summary="Queue a dead-lettered webhook delivery again",
+    status_code=status.HTTP_200_OK,
+    response_model=WebhookDeliveryModel
+)
+async def retry_dead_letter(id: MongoID):
+
+    delivery_document = await webhook_outbox.requeue(id)
+
+    if not delivery_document:
+        raise HTTPException(
+            detail="No dead-lettered delivery found with this id.",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    return delivery_document
+
+
+@router.delete(
+    "/dead-letters/{id}",
+    summary="Discard a dead-lettered webhook delivery",
+    status_code=status.HTTP_200_OK,
+    response_model=WebhookDeliveryModel
+)
+async def delete_dead_letter(id: MongoID):
+
+    delivery_document = await mongodb_helper.delete_webhook_dead_letter(id)
+
+    if not delivery_document:
+        raise HTTPException(
+            detail="No dead-lettered delivery found with this id.",
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    return delivery_document
@@ -0,0 +1,70 @@
+"""Compare the ACL compiler against the original per-service scan.
+
+Run from ``proxy-listener/``::
+
+    uv run python -m benchmarks.acl_compiler
+
+Each row doubles the grant count with a fixed service count. Time per grant stays
+roughly flat for the compiler (linear scaling), while the legacy generator's time
+per grant grows with both services and grants.
+"""
+import time
+from utilities.acl import AclCompiler
+from benchmarks.synthetic import synthetic_data
+
+SERVICE_COUNT = 500
+GRANT_COUNTS = (1_000, 2_000, 4_000, 8_000, 16_000, 32_000, 50_000)
+LEGACY_MAX_GRANTS = 8_000
+
+
+def legacy_generator(services: list[dict], connections: list[dict]) -> dict[str, list[str]]:
+    """The pre-compiler algorithm: O(services × connections) with list de-duplication."""
+
+    result = {}
+
+    for service in services:
+
+        allowed_ips = []
+
+        for connection in connections:
+
+            if connection["service_name"] == service["name"]:
+
+                content = "allow " + connection["ip_address"] + ";"
+
+                if content not in allowed_ips:
+                    allowed_ips.append(content)
+
+        result[service["name"]] = allowed_ips
+
+    return result
+
+
+def timed(func, *args) -> float:
+
+    started = time.perf_counter()
+    func(*args)
+
+    return time.perf_counter() - started
+
+
+def main() -> None:
+
+    print(f"{'grants':>8} {'compiler ms':>12} {'ns/grant':>9} {'legacy ms':>10} {'ns/grant':>9}")
+
+    for grant_count in GRANT_COUNTS:
+
+        services, connections = synthetic_data(SERVICE_COUNT, grant_count)
+
+        compiler = timed(AclCompiler.group_by_service, services, connections)
+        line = f"{grant_count:>8} {compiler * 1000:>12.2f} {compiler * 1e9 / grant_count:>9.0f}"
+
+        if grant_count <= LEGACY_MAX_GRANTS:
+            legacy = timed(legacy_generator, services, connections)
+            line += f" {legacy * 1000:>10.2f} {legacy * 1e9 / grant_count:>9.0f}"
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
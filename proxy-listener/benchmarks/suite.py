@@ -0,0 +1,221 @@
+"""Offline benchmark harness for the listener's generate-and-apply cycle.
+
+Run from ``proxy-listener/``::
+
+    uv run python -m benchmarks.suite --output bench.json
+
+For every (grants, services, mode) combination it times, against a temporary
+nginx directory:
+
+- ``compile``        grouping, sorting and CIDR aggregation (``AclCompiler``)
+- ``render_full``    rendering every file with no previous state
+- ``diff_unchanged`` rendering against the state just applied (nothing to write)
+- ``diff_1pct``      rendering after 1% of the grants changed
+- ``write``          writing the changed files of a full render
+- ``reload_subprocess`` / ``reload_signal``  reloading a stub nginx (once per run)
+
+Timings are reported in seconds (min and median over ``--repeat`` runs) as JSON,
+so results can be compared between releases.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# Keep per-file INFO logging out of the timings; must be set before utilities are imported.
+os.environ.setdefault("LOGGER_LEVEL", "WARNING")
+
+from benchmarks.synthetic import synthetic_data, mutate  # noqa: E402
+from utilities import nginx as nginx_module  # noqa: E402
+from utilities import reload as reload_module  # noqa: E402
+from utilities.acl import AclCompiler  # noqa: E402
+from utilities.nginx import Nginx  # noqa: E402
+
+DEFAULT_GRANTS = (1, 100, 1_000, 10_000, 100_000)
+DEFAULT_SERVICES = (1, 10, 100, 1_000)
+DEFAULT_MODES = ("files", "geo")
+SCHEMA_VERSION = 1
+
+STUB_NGINX = """import sys
+sys.exit(0)
+"""
+
+STUB_MASTER = """import signal, time
+signal.signal(signal.SIGHUP, lambda *_: None)
+while True:
+    time.sleep(60)
+"""
+
+
+def measure(func, repeat: int) -> dict[str, float]:
+
+    samples = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+
+    return {"min": min(samples), "median": statistics.median(samples)}
+
+
+def compile_all(services: list[dict], connections: list[dict]) -> None:
+
+    for addresses in AclCompiler.group_by_service(services, connections).values():
+        AclCompiler.collapse(addresses)
+
+
+def render(nginx_path: str, services: list[dict], connections: list[dict], previous_state: dict | None = None):
+
+    return Nginx.render_address_whitelists(
+        nginx_path=nginx_path,
+        services=services,
+        connections=connections,
+        previous_state=previous_state,
+    )
+
+
+def write_files(changed_files: dict[str, str]) -> None:
+
+    for filepath, content in changed_files.items():
+        Nginx.write_config_file(filepath, content)
+
+
+def bench_case(workdir: str, grants: int, services_count: int, mode: str, repeat: int) -> dict:
+
+    nginx_module.ACL_OUTPUT_MODE = mode
+
+    nginx_path = os.path.join(workdir, f"nginx-{mode}-{grants}-{services_count}")
+    os.makedirs(os.path.join(nginx_path, "allowed-ips"), exist_ok=True)
+    os.makedirs(os.path.join(nginx_path, os.path.dirname(nginx_module.ACL_GEO_FILE)), exist_ok=True)
+
+    services, connections = synthetic_data(services_count, grants)
+    changed_connections = mutate(connections, 0.01)
+
+    state, changed_files = render(nginx_path, services, connections)
+
+    timings = {
+        "compile": measure(lambda: compile_all(services, connections), repeat),
+        "render_full": measure(lambda: render(nginx_path, services, connections), repeat),
+        "diff_unchanged": measure(lambda: render(nginx_path, services, connections, state), repeat),
+        "diff_1pct": measure(lambda: render(nginx_path, services, changed_connections, state), repeat),
+        "write": measure(lambda: write_files(changed_files), repeat),
+    }
+
+    _, changed_after_1pct = render(nginx_path, services, changed_connections, state)
+    shutil.rmtree(nginx_path, ignore_errors=True)
+
+    return {
+        "grants": grants,
+        "services": services_count,
+        "mode": mode,
+        "files_full": len(changed_files),
+        "files_after_1pct": len(changed_after_1pct),
+        "seconds": timings,
+    }
+
+
+def bench_reload(workdir: str, repeat: int) -> dict:
+
+    results = {}
+
+    stub = os.path.join(workdir, "nginx_stub.py")
+
+    with open(stub, "w") as f:
+        f.write(STUB_NGINX)
+
+    os.environ["NGINX_BINARY"] = f"{sys.executable} {stub}"
+    results["reload_subprocess"] = measure(lambda: Nginx.nginx_run("-s", "reload"), repeat)
+
+    if os.name != "posix":
+        return results
+
+    master = subprocess.Popen([sys.executable, "-c", STUB_MASTER])
+
+    try:
+
+        pid_file = os.path.join(workdir, "nginx.pid")
+
+        with open(pid_file, "w") as f:
+            f.write(str(master.pid))
+
+        # Give the stub time to install its SIGHUP handler.
+        time.sleep(0.5)
+
+        reload_module.NGINX_PID_FILE = pid_file
+        controller = reload_module.ReloadController()
+
+        if controller.resolve() == "pid":
+            results["reload_signal"] = measure(controller.reload, repeat)
+
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait()
+
+    return results
+
+
+def parse_counts(value: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in value.split(",") if part.strip())
+
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Benchmark the listener's generate-and-apply cycle.")
+    parser.add_argument("--grants", type=parse_counts, default=DEFAULT_GRANTS, help="comma-separated grant counts")
+    parser.add_argument("--services", type=parse_counts, default=DEFAULT_SERVICES, help="comma-separated service counts")
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES), help="comma-separated ACL_OUTPUT_MODE values")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    workdir = tempfile.mkdtemp(prefix="rpacm-bench-")
+
+    try:
+
+        cases = []
+
+        for mode in modes:
+            for services_count in args.services:
+                for grants in args.grants:
+                    case = bench_case(workdir, grants, services_count, mode, args.repeat)
+                    cases.append(case)
+                    print(
+                        f"{mode:>5} services={services_count:<5} grants={grants:<7} "
+                        f"render_full={case['seconds']['render_full']['median'] * 1000:.1f}ms",
+                        file=sys.stderr,
+                    )
+
+        report = {
+            "schema_version": SCHEMA_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "aggregate_cidrs": nginx_module.ACL_AGGREGATE_CIDRS,
+            "repeat": args.repeat,
+            "cases": cases,
+            "reload": bench_reload(workdir, args.repeat),
+        }
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    payload = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Synthetic service and connection sets shared by the listener benchmarks."""
+import random
+
+
+def synthetic_data(service_count: int, grant_count: int, seed: int = 1) -> tuple[list[dict], list[dict]]:
+    """Return ``(services, connections)`` shaped like the private API responses.
+
+    Addresses are drawn from ``10.0.0.0/8`` so some of them form contiguous runs,
+    as approved office ranges do.
+    """
+
+    rng = random.Random(seed)
+    services = [{"name": f"service-{i}.example.com", "port": 8000 + i} for i in range(service_count)]
+    connections = [
+        {
+            "service_name": services[rng.randrange(service_count)]["name"],
+            "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+        }
+        for _ in range(grant_count)
+    ]
+
+    return services, connections
+
+
+def mutate(connections: list[dict], fraction: float, seed: int = 2) -> list[dict]:
+    """Return a copy of ``connections`` with ``fraction`` of them replaced by new grants."""
+
+    rng = random.Random(seed)
+    mutated = list(connections)
+
+    for index in rng.sample(range(len(mutated)), k=int(len(mutated) * fraction)):
+        mutated[index] = {
+            "service_name": mutated[index]["service_name"],
+            "ip_address": f"172.16.{rng.randrange(256)}.{rng.randrange(256)}",
+        }
+
+    return mutated
@@ -4,7 +4,9 @@ from utilities.nginx import Nginx
 from utilities.backend import Backend
 from dotenv import load_dotenv, set_key
 from utilities.logger import create_logger
+from utilities.metrics import start_metrics_server
 from utilities.polling import PollingAndProcessing
+from utilities.runtime import AsyncPollingRuntime
 
 
 ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
@@ -13,6 +15,8 @@ load_dotenv(ENV_PATH)
 
 log = create_logger(alias="main")
 
+LISTENER_RUNTIME = os.getenv("LISTENER_RUNTIME", "async").strip().lower() or "async"
+
 PROMPT_ICON = f"{Fore.CYAN}>{Style.RESET_ALL} "
 
 
@@ -153,7 +157,10 @@ def main():
         continue
 
     # Authentication Complete
-    polling_and_processing = PollingAndProcessing(nginx_path=nginx_path, private_api=private_api)
+    start_metrics_server()
+
+    runtime_class = PollingAndProcessing if LISTENER_RUNTIME == "sync" else AsyncPollingRuntime
+    polling_and_processing = runtime_class(nginx_path=nginx_path, private_api=private_api)
     polling_and_processing.poll_and_process()
 
 
@@ -18,3 +18,38 @@ FALLBACK_WEBSITE_NGINX_CONFIG_TEMPLATE = """server {{
     }}
 }}
 """
+
+# Per-service snippet for ACL_OUTPUT_MODE=auth_request, included in the service's server or location block.
+AUTH_REQUEST_SNIPPET_TEMPLATE = """set $rpacm_service "{service_name}";
+auth_request {auth_location};
+{error_page}"""
+
+# Server-level include for ACL_OUTPUT_MODE=auth_request: the internal location every
+# per-service snippet of that server block sends its subrequest to. Include it once per server.
+AUTH_REQUEST_LOCATION_TEMPLATE = """# Generated by proxy-listener. Do not edit by hand.
+location = {auth_location} {{
+    internal;
+    auth_request off;
+
+    proxy_pass http://{backend_host}:{backend_port}/authorize;
+    proxy_pass_request_body off;
+    proxy_set_header Content-Length "";
+    proxy_set_header X-Original-Host $host;
+    proxy_set_header X-Original-URI $request_uri;
+    proxy_set_header X-RPACM-Service $rpacm_service;
+    proxy_set_header X-Forwarded-For $remote_addr;
+{cache_directives}}}
+"""
+
+AUTH_REQUEST_CACHE_DIRECTIVES_TEMPLATE = """
+    # Cache decisions briefly per client, service, host and path; grants apply within {cache_seconds}s
+    proxy_cache {cache_zone};
+    proxy_cache_key "$remote_addr|$rpacm_service|$host|$request_uri";
+    proxy_cache_valid 204 403 {cache_seconds}s;
+    proxy_cache_lock on;
+"""
+
+# http-level include declaring the decision cache used by the auth_request location.
+AUTH_REQUEST_CACHE_ZONE_TEMPLATE = """# Generated by proxy-listener. Do not edit by hand.
+proxy_cache_path {cache_path} levels=1:2 keys_zone={cache_zone}:10m max_size=64m inactive=10m use_temp_path=off;
+"""
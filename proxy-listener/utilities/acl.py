@@ -0,0 +1,156 @@
+import re
+import hashlib
+import ipaddress
+from utilities.logger import create_logger
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+
+log = create_logger(logger_name="ProxyListener_util_acl", alias="ACL")
+
+
+class AclCompiler:
+    """Compile services and connections into per-service address lists.
+
+    Connections are grouped in a single pass (O(services + connections)) into
+    sets, then each service's set is sorted once, so output is deterministic
+    regardless of API ordering. Addresses are parsed once even when the same
+    IP is granted on many services.
+    """
+
+    @staticmethod
+    def identifier(service_name: str) -> str:
+        """Return a stable identifier safe for nft set names and nginx variables.
+
+        The sanitized name keeps it readable; the hash suffix keeps names that
+        sanitize to the same string apart.
+        """
+
+        sanitized = re.sub(r"[^A-Za-z0-9_]", "_", service_name)[:32]
+        digest = hashlib.sha1(service_name.encode("utf-8")).hexdigest()[:8]
+
+        return f"{sanitized}_{digest}"
+
+    @staticmethod
+    def normalize_address(ip_address: str) -> IPAddress | None:
+        """Parse an address, unwrapping IPv4-mapped IPv6 (``::ffff:a.b.c.d``). Returns None if invalid."""
+
+        try:
+            address = ipaddress.ip_address(str(ip_address).strip())
+        except ValueError:
+            return None
+
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            return address.ipv4_mapped
+
+        return address
+
+    @staticmethod
+    def sort_key(address: IPAddress) -> tuple[int, int]:
+        """Numeric sort order: every IPv4 address before any IPv6 address."""
+        return address.version, int(address)
+
+    @staticmethod
+    def group_by_service(services: list[dict], connections: list[dict]) -> dict[str, list[IPAddress]]:
+        """Return ``{service_name: [address, ...]}`` sorted and de-duplicated, for every service.
+
+        Connections for unknown services and unparsable addresses are skipped.
+        Services without grants map to an empty list.
+        """
+
+        grouped: dict[str, set[IPAddress]] = {service["name"]: set() for service in services}
+        parsed: dict[str, IPAddress | None] = {}
+
+        for connection in connections:
+
+            bucket = grouped.get(connection["service_name"])
+
+            if bucket is None:
+                continue
+
+            raw = connection["ip_address"]
+            address = parsed.get(raw)
+
+            if address is None and raw not in parsed:
+                address = parsed[raw] = AclCompiler.normalize_address(raw)
+
+                if address is None:
+                    log.warning(f"Skipping invalid address '{raw}'")
+
+            if address is not None:
+                bucket.add(address)
+
+        return {name: sorted(addresses, key=AclCompiler.sort_key) for name, addresses in grouped.items()}
+
+    @staticmethod
+    def merge_ranges(values: list[int]) -> list[tuple[int, int]]:
+        """Merge sorted, de-duplicated integers into inclusive ``(start, end)`` runs in one linear pass."""
+
+        ranges: list[tuple[int, int]] = []
+
+        if not values:
+            return ranges
+
+        start = end = values[0]
+
+        for value in values[1:]:
+
+            if value == end + 1:
+                end = value
+                continue
+
+            ranges.append((start, end))
+            start = end = value
+
+        ranges.append((start, end))
+
+        return ranges
+
+    @staticmethod
+    def range_to_prefixes(start: int, end: int, bits: int) -> list[tuple[int, int]]:
+        """Split an inclusive integer range into the minimal list of aligned ``(network, prefix_length)`` blocks.
+
+        The blocks cover exactly ``start..end``, never more.
+        """
+
+        prefixes: list[tuple[int, int]] = []
+
+        while start <= end:
+
+            # Largest block aligned at `start` ...
+            size = start & -start if start else 1 << bits
+            remaining = end - start + 1
+
+            # ... that does not run past `end`.
+            while size > remaining:
+                size >>= 1
+
+            prefixes.append((start, bits - size.bit_length() + 1))
+            start += size
+
+        return prefixes
+
+    @staticmethod
+    def collapse(addresses: list[IPAddress]) -> list[str]:
+        """Collapse sorted, de-duplicated addresses into minimal covering CIDR blocks.
+
+        Works on plain integers per address family: adjacent addresses are merged into
+        runs, and each run is split into aligned prefixes. Only granted addresses are
+        covered; single hosts are rendered without a ``/32`` or ``/128`` suffix.
+        """
+
+        rules: list[str] = []
+
+        for version, bits, factory in ((4, 32, ipaddress.IPv4Address), (6, 128, ipaddress.IPv6Address)):
+
+            values = [int(address) for address in addresses if address.version == version]
+
+            for start, end in AclCompiler.merge_ranges(values):
+
+                for network, prefix_length in AclCompiler.range_to_prefixes(start, end, bits):
+
+                    if prefix_length == bits:
+                        rules.append(str(factory(network)))
+                    else:
+                        rules.append(f"{factory(network)}/{prefix_length}")
+
+        return rules
@@ -82,7 +82,7 @@ class Backend:
 
         return response.json()
 
-    def get_connection_list(self, all_services: list[dict]) -> list[dict]:
+    def get_connection_list(self, all_services: list[dict] | None = None) -> list[dict]:
         """GET /connection/get-connection-list — requires auth."""
 
         response = requests.get(
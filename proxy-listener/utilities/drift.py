@@ -0,0 +1,207 @@
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import hashlib
+import threading
+from collections.abc import Callable
+from dotenv import load_dotenv
+from utilities.state import AppliedState
+from utilities.logger import create_logger
+
+DOTENV_PATH = ".env"
+
+load_dotenv(DOTENV_PATH)
+
+DRIFT_DETECTION = os.getenv("DRIFT_DETECTION", "auto").strip().lower() or "auto"
+DRIFT_CHECK_INTERVAL = int(os.getenv("DRIFT_CHECK_INTERVAL", 30))
+DRIFT_DEBOUNCE_SECONDS = float(os.getenv("DRIFT_DEBOUNCE_SECONDS", 0.5))
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ATTRIB
+EVENT_HEADER = struct.Struct("iIII")
+
+log = create_logger(logger_name="ProxyListener_util_drift", alias="Drift")
+
+
+def file_hash(filepath: str) -> str | None:
+    """sha256 of a file's content, or None if it cannot be read."""
+
+    try:
+        with open(filepath, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class DriftWatcher:
+    """Detect managed ACL files that no longer match the last applied state.
+
+    On Linux the watched directories are monitored with inotify from a daemon
+    thread blocked in ``read``, so an idle listener spends no CPU on it.
+    Events are debounced and only the files they name are re-hashed. Elsewhere,
+    or if inotify is unavailable, every managed file is re-hashed every
+    ``DRIFT_CHECK_INTERVAL`` seconds.
+
+    Both modes check every managed file once when they start, so files changed
+    while the listener was down are caught.
+
+    Drifted paths are handed to ``on_drift``. The listener rewrites them from
+    state and reloads nginx once.
+    """
+
+    def __init__(self, nginx_path: str, applied_state: AppliedState, on_drift: Callable[[set[str]], None]) -> None:
+        self.nginx_path = nginx_path
+        self.applied_state = applied_state
+        self.on_drift = on_drift
+
+    def check(self, paths: set[str] | None = None) -> set[str]:
+        """Return the managed paths (all, or those in ``paths``) whose content differs from the applied state."""
+
+        expected = self.applied_state.files_snapshot()
+
+        if paths is not None:
+            expected = {path: expected[path] for path in paths if path in expected}
+
+        return {path for path, content_hash in expected.items() if file_hash(path) != content_hash}
+
+    def _report(self, drifted: set[str]) -> None:
+
+        if not drifted:
+            return
+
+        log.warning(f"Detected drift in {len(drifted)} managed file(s): {', '.join(sorted(drifted))}")
+        self.on_drift(drifted)
+
+    def start(self) -> str:
+        """Start watching in a daemon thread. Returns the mode used (``inotify``, ``polling`` or ``off``)."""
+
+        if DRIFT_DETECTION == "off":
+            log.info("Drift detection disabled")
+            return "off"
+
+        if DRIFT_DETECTION in ("auto", "inotify"):
+
+            inotify_fd = self._inotify_init()
+
+            if inotify_fd is not None:
+                threading.Thread(target=self._inotify_loop, args=(inotify_fd,), name="drift-inotify", daemon=True).start()
+                log.info("Watching managed files for drift with inotify")
+                return "inotify"
+
+        threading.Thread(target=self._polling_loop, name="drift-polling", daemon=True).start()
+        log.info(f"Checking managed files for drift every {DRIFT_CHECK_INTERVAL}s")
+        return "polling"
+
+    def _check_all(self) -> None:
+
+        try:
+            self._report(self.check())
+        except Exception as e:
+            log.error(f"Drift check failed: {e}")
+
+    def _polling_loop(self) -> None:
+
+        while True:
+            self._check_all()
+            time.sleep(DRIFT_CHECK_INTERVAL)
+
+    def _watched_directories(self) -> set[str]:
+
+        directories = {os.path.join(self.nginx_path, "allowed-ips")}
+        directories.update(os.path.dirname(path) for path in self.applied_state.files_snapshot())
+
+        return {directory for directory in directories if os.path.isdir(directory)}
+
+    def _inotify_init(self) -> int | None:
+
+        if not sys.platform.startswith("linux"):
+            return None
+
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            inotify_fd = self._libc.inotify_init1(IN_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            log.debug(f"inotify unavailable: {e}")
+            return None
+
+        if inotify_fd < 0:
+            log.debug(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+            return None
+
+        self._watches: dict[int, str] = {}
+
+        for directory in self._watched_directories():
+
+            watch = self._libc.inotify_add_watch(inotify_fd, directory.encode(), WATCH_MASK)
+
+            if watch < 0:
+                log.debug(f"inotify_add_watch({directory}) failed: {os.strerror(ctypes.get_errno())}")
+                os.close(inotify_fd)
+                return None
+
+            self._watches[watch] = directory
+
+        return inotify_fd
+
+    def _read_events(self, inotify_fd: int) -> set[str]:
+
+        buffer = os.read(inotify_fd, 64 * 1024)
+        touched: set[str] = set()
+        offset = 0
+
+        while offset + EVENT_HEADER.size <= len(buffer):
+
+            watch, mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0").decode(errors="replace")
+            offset += EVENT_HEADER.size + length
+
+            directory = self._watches.get(watch)
+
+            if directory is not None and name:
+                touched.add(os.path.join(directory, name))
+
+        return touched
+
+    def _inotify_loop(self, inotify_fd: int) -> None:
+
+        # Files edited or deleted while the listener was down raise no event; the
+        # watches are already in place, so nothing changed after this check is missed.
+        self._check_all()
+
+        while True:
+
+            try:
+
+                # Blocks until something in a watched directory changes.
+                touched = self._read_events(inotify_fd)
+
+                # Collect the rest of a burst (editors write via temp file + rename).
+                deadline = time.monotonic() + DRIFT_DEBOUNCE_SECONDS
+
+                while (remaining := deadline - time.monotonic()) > 0:
+
+                    readable, _, _ = select.select([inotify_fd], [], [], remaining)
+
+                    if not readable:
+                        break
+
+                    touched |= self._read_events(inotify_fd)
+
+                self._report(self.check(touched))
+
+            except Exception as e:
+                log.error(f"Drift watcher failed: {e}")
+                time.sleep(DRIFT_CHECK_INTERVAL)
@@ -0,0 +1,264 @@
+import os
+import time
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from utilities.logger import create_logger
+
+DOTENV_PATH = ".env"
+
+load_dotenv(DOTENV_PATH)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+METRICS_PORT = os.getenv("METRICS_PORT", "9108").strip()
+POLLING_INTERVAL = int(os.getenv("POLLING_INTERVAL", 60))
+
+# A sync older than this many polling intervals marks the listener as not ready.
+READINESS_STALE_INTERVALS = int(os.getenv("READINESS_STALE_INTERVALS", 3))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = create_logger(logger_name="ProxyListener_util_metrics", alias="Metrics")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+
+    if not labels:
+        return ""
+
+    pairs = []
+
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{escaped}"')
+
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(_Metric):
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function=None):
+        super().__init__(name, documentation)
+        self._values: dict[tuple, float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = float(value)
+
+    def value(self, **labels: str) -> float | None:
+        return self._values.get(tuple(sorted(labels.items())))
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        if self._function is not None:
+            value = self._function()
+            if value is not None:
+                lines.append(f"{self.name} {value}")
+            return lines
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self._buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = self._series[key] = [0] * len(self._buckets) + [0.0, 0]
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self._buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', repr(bound)),))} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class _Timer:
+
+    def __init__(self, histogram: Histogram, labels: dict[str, str]):
+        self._histogram = histogram
+        self._labels = labels
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.elapsed = time.perf_counter() - self._start
+        self._histogram.observe(self.elapsed, **self._labels)
+
+
+class Metrics:
+    """Process-wide listener metrics, exposed in the Prometheus text format."""
+
+    started_at = time.time()
+    last_success_at: float | None = None
+
+    poll_duration = Histogram("rpacm_listener_poll_duration_seconds", "Duration of a full poll cycle.")
+    fetch_duration = Histogram("rpacm_listener_fetch_duration_seconds", "Latency of private API fetches by resource.")
+    fetch_failures = Counter("rpacm_listener_fetch_failures_total", "Failed private API fetches by resource.")
+    connections = Gauge("rpacm_listener_connections", "Number of active connections in the last fetch.")
+    services = Gauge("rpacm_listener_services", "Number of services in the last fetch.")
+    acl_rules = Gauge("rpacm_listener_acl_rules", "Allowed addresses and emitted allow rules after CIDR aggregation.")
+    files_written = Counter("rpacm_listener_files_written_total", "ACL files written to disk.")
+    drift_repairs = Counter("rpacm_listener_drift_repairs_total", "Managed ACL files rewritten after drifting from the applied state.")
+    reload_duration = Histogram("rpacm_listener_reload_duration_seconds", "Duration of nginx reload requests (config test and signal, or `nginx -s reload`).")
+    reload_failures = Counter("rpacm_listener_reload_failures_total", "Failed nginx reloads.")
+    syncs = Counter("rpacm_listener_syncs_total", "Completed poll cycles by result.")
+    last_success_timestamp = Gauge(
+        "rpacm_listener_last_success_timestamp_seconds",
+        "UNIX time of the last successful sync.",
+        function=lambda: Metrics.last_success_at,
+    )
+    seconds_since_last_success = Gauge(
+        "rpacm_listener_seconds_since_last_success",
+        "Seconds since the last successful sync (since start if none yet).",
+        function=lambda: time.time() - (Metrics.last_success_at or Metrics.started_at),
+    )
+
+    @staticmethod
+    def mark_success() -> None:
+        Metrics.last_success_at = time.time()
+        Metrics.syncs.inc(result="success")
+
+    @staticmethod
+    def is_ready() -> bool:
+        """Ready once a sync has succeeded within ``READINESS_STALE_INTERVALS`` polling intervals."""
+
+        if Metrics.last_success_at is None:
+            return False
+
+        return time.time() - Metrics.last_success_at <= POLLING_INTERVAL * READINESS_STALE_INTERVALS
+
+    @staticmethod
+    def render() -> str:
+
+        lines: list[str] = []
+
+        for metric in vars(Metrics).values():
+            if isinstance(metric, _Metric):
+                lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        path = self.path.split("?", 1)[0]
+
+        if path == "/metrics":
+            self._send(200, Metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+
+        elif path == "/healthz":
+            self._send(200, json.dumps({"status": "alive"}), "application/json")
+
+        elif path == "/readyz":
+            ready = Metrics.is_ready()
+            body = json.dumps({"ready": ready, "last_success_at": Metrics.last_success_at})
+            self._send(200 if ready else 503, body, "application/json")
+
+        else:
+            self._send(404, json.dumps({"detail": "Not Found"}), "application/json")
+
+    def _send(self, status_code: int, body: str, content_type: str) -> None:
+
+        payload = body.encode("utf-8")
+
+        self.send_response(status_code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: str = METRICS_PORT) -> ThreadingHTTPServer | None:
+    """Serve ``/metrics``, ``/healthz`` and ``/readyz`` from a daemon thread. Disabled when port is empty."""
+
+    if not port:
+        log.info("Metrics endpoint disabled (METRICS_PORT is empty)")
+        return None
+
+    try:
+        server = ThreadingHTTPServer((host, int(port)), _MetricsRequestHandler)
+    except OSError as e:
+        log.error(f"Failed to start metrics endpoint on {host}:{port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+
+    log.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return server
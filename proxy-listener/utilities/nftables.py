@@ -0,0 +1,248 @@
+import os
+import ipaddress
+import subprocess
+from dotenv import load_dotenv
+from utilities.acl import AclCompiler
+from utilities.logger import create_logger
+
+DOTENV_PATH = ".env"
+
+load_dotenv(DOTENV_PATH)
+
+NFT_BINARY = os.getenv("NFT_BINARY", "nft").strip() or "nft"
+NFT_TABLE = os.getenv("NFT_TABLE", "rpacm").strip() or "rpacm"
+NFT_FAMILY = "inet"
+
+# Services clients reach directly on this host, not through nginx: "<service>[=<public port>]", comma-separated.
+NFT_DIRECT_SERVICES = os.getenv("NFT_DIRECT_SERVICES", "")
+# Ports a direct service may not claim (nginx listens there, including the access request site).
+# Only used to skip such NFT_DIRECT_SERVICES entries; nothing is opened or filtered for them.
+NFT_RESERVED_PORTS = os.getenv("NFT_RESERVED_PORTS", "80,443")
+
+log = create_logger(logger_name="ProxyListener_util_nftables", alias="nftables")
+
+
+def _parse_port(value: str, setting: str, entry: str) -> int:
+
+    try:
+        port = int(value)
+    except ValueError:
+        port = 0
+
+    if not 1 <= port <= 65535:
+        raise ValueError(f"{setting}: invalid port in entry '{entry}'")
+
+    return port
+
+
+def parse_direct_services(value: str, setting: str = "NFT_DIRECT_SERVICES") -> dict[str, int | None]:
+    """Parse ``NFT_DIRECT_SERVICES`` into ``{service_name: public_port or None}``.
+
+    Raises:
+        ValueError: Naming the first malformed entry.
+    """
+
+    direct: dict[str, int | None] = {}
+
+    for entry in value.split(","):
+
+        if not entry.strip():
+            continue
+
+        name, separator, port = entry.strip().partition("=")
+
+        if not name.strip():
+            raise ValueError(f"{setting}: missing service name in entry '{entry.strip()}'")
+
+        direct[name.strip()] = _parse_port(port.strip(), setting, entry.strip()) if separator else None
+
+    return direct
+
+
+def parse_ports(value: str, setting: str = "NFT_RESERVED_PORTS") -> set[int]:
+    """Parse a comma-separated port list. Raises ValueError naming the first bad entry."""
+
+    return {_parse_port(port.strip(), setting, port.strip()) for port in value.split(",") if port.strip()}
+
+
+# Parsed once at import, so a typo stops the listener at startup instead of failing every poll.
+DIRECT_SERVICES = parse_direct_services(NFT_DIRECT_SERVICES)
+RESERVED_PORTS = parse_ports(NFT_RESERVED_PORTS)
+
+
+class Nftables:
+    """Render per-service nftables sets and apply them as incremental batches.
+
+    Only services listed in ``NFT_DIRECT_SERVICES`` are enforced here: services
+    that clients reach directly on this host, each on a public port of its own
+    (the listed port, or the service's ``port``). Each one gets an ``ipv4_addr``
+    and an ``ipv6_addr`` hash set, and an ``input`` chain rule that drops
+    traffic to its public port unless the source address is a member.
+    Membership checks are O(1) in the kernel and grants/revokes are applied as
+    ``add element`` / ``delete element`` batches.
+
+    Services proxied by nginx cannot be told apart by port (clients reach them
+    on nginx's shared listener, and nginx alone reaches the backend port), so
+    they keep the nginx ACL, which the listener writes with either backend.
+
+    Everything except :meth:`apply_batch` is pure, so rule batches can be
+    generated and diffed without root.
+    """
+
+    @staticmethod
+    def set_name(service_name: str, family: str) -> str:
+        """Return a stable, nft-safe set name for a service and address family (``v4``/``v6``)."""
+
+        return f"{AclCompiler.identifier(service_name)}_{family}"
+
+    @staticmethod
+    def direct_services(
+        services: list[dict],
+        direct: dict[str, int | None] | None = None,
+        reserved_ports: set[int] | None = None,
+    ) -> tuple[list[tuple[dict, int]], list[str]]:
+        """Return the ``(service, public_port)`` pairs to enforce, and why any listed service was left out.
+
+        A listed service is skipped when it does not exist, when its port is
+        reserved for nginx, or when an earlier (by name) listed service already
+        uses the port: one drop rule per port, so a client never has to be in
+        two services' sets at once.
+        """
+
+        direct = DIRECT_SERVICES if direct is None else direct
+        reserved_ports = RESERVED_PORTS if reserved_ports is None else reserved_ports
+
+        by_name = {service["name"]: service for service in services}
+        enforced: list[tuple[dict, int]] = []
+        owners: dict[int, str] = {}
+        skipped: list[str] = []
+
+        for name in sorted(direct):
+
+            service = by_name.get(name)
+
+            if service is None:
+                skipped.append(f"'{name}' is not a known service")
+                continue
+
+            port = direct[name] or int(service.get("port") or 80)
+
+            if port in reserved_ports:
+                skipped.append(f"'{name}' uses port {port}, reserved for nginx (NFT_RESERVED_PORTS)")
+                continue
+
+            if port in owners:
+                skipped.append(f"'{name}' shares port {port} with '{owners[port]}'")
+                continue
+
+            owners[port] = name
+            enforced.append((service, port))
+
+        return enforced, skipped
+
+    @staticmethod
+    def build_sets(services: list[dict], connections: list[dict]) -> dict[str, set[str]]:
+        """Group allowed addresses into ``{set_name: {address, ...}}`` for every service."""
+
+        sets: dict[str, set[str]] = {}
+
+        for service_name, addresses in AclCompiler.group_by_service(services, connections).items():
+
+            sets[Nftables.set_name(service_name, "v4")] = {str(a) for a in addresses if a.version == 4}
+            sets[Nftables.set_name(service_name, "v6")] = {str(a) for a in addresses if a.version == 6}
+
+        return sets
+
+    @staticmethod
+    def render_ruleset(direct: list[tuple[dict, int]], sets: dict[str, set[str]]) -> list[str]:
+        """Render the full table (sets, chain and rules) for the ``direct_services`` pairs as one atomic nft batch.
+
+        The leading ``add table`` / ``delete table`` pair makes the batch
+        idempotent whether or not the table already exists.
+        """
+
+        table = f"{NFT_FAMILY} {NFT_TABLE}"
+
+        batch = [
+            f"add table {table}",
+            f"delete table {table}",
+            f"add table {table}",
+            f"add chain {table} input {{ type filter hook input priority 0; policy accept; }}",
+        ]
+
+        for service, port in sorted(direct, key=lambda pair: pair[0]["name"]):
+
+            v4 = Nftables.set_name(service["name"], "v4")
+            v6 = Nftables.set_name(service["name"], "v6")
+
+            batch.append(f"add set {table} {v4} {{ type ipv4_addr; }}")
+            batch.append(f"add set {table} {v6} {{ type ipv6_addr; }}")
+
+            batch.extend(Nftables._element_commands("add", v4, sets.get(v4, set())))
+            batch.extend(Nftables._element_commands("add", v6, sets.get(v6, set())))
+
+            batch.append(f"add rule {table} input meta nfproto ipv4 tcp dport {port} ip saddr != @{v4} drop")
+            batch.append(f"add rule {table} input meta nfproto ipv6 tcp dport {port} ip6 saddr != @{v6} drop")
+
+        return batch
+
+    @staticmethod
+    def diff_sets(previous: dict[str, set[str]], current: dict[str, set[str]]) -> list[str]:
+        """Return the ``add element`` / ``delete element`` batch turning ``previous`` into ``current``.
+
+        Both mappings must share the same set names; use :meth:`render_ruleset`
+        when services were added, removed or changed.
+        """
+
+        batch: list[str] = []
+
+        for name in sorted(current):
+
+            before = previous.get(name, set())
+            after = current[name]
+
+            batch.extend(Nftables._element_commands("delete", name, before - after))
+            batch.extend(Nftables._element_commands("add", name, after - before))
+
+        return batch
+
+    @staticmethod
+    def _element_commands(action: str, set_name: str, addresses: set[str], chunk_size: int = 1000) -> list[str]:
+
+        ordered = sorted(addresses, key=lambda a: AclCompiler.sort_key(ipaddress.ip_address(a)))
+        commands = []
+
+        for start in range(0, len(ordered), chunk_size):
+
+            elements = ", ".join(ordered[start:start + chunk_size])
+            commands.append(f"{action} element {NFT_FAMILY} {NFT_TABLE} {set_name} {{ {elements} }}")
+
+        return commands
+
+    @staticmethod
+    def apply_batch(batch: list[str]) -> bool:
+        """Apply a batch atomically through ``nft -f -``. Requires CAP_NET_ADMIN.
+
+        Returns:
+            True on success, False if nft is missing or rejected the batch.
+        """
+
+        if not batch:
+            return True
+
+        try:
+            result = subprocess.run(
+                [NFT_BINARY, "-f", "-"],
+                input="\n".join(batch) + "\n",
+                capture_output=True, text=True, timeout=30,
+            )
+        except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+            log.error(f"Failed to run {NFT_BINARY}: {e}")
+            return False
+
+        if result.returncode != 0:
+            log.error(f"nft rejected the batch:\n{result.stderr}")
+            return False
+
+        log.info(f"Applied nftables batch ({len(batch)} command(s))")
+        return True
@@ -1,10 +1,19 @@
 import os
 import shutil
+import hashlib
 import subprocess
 from dotenv import load_dotenv, set_key
 from pydantic import IPvAnyAddress
-from schemas.nginx_configuration import FALLBACK_WEBSITE_NGINX_CONFIG_TEMPLATE
+from schemas.nginx_configuration import (
+    FALLBACK_WEBSITE_NGINX_CONFIG_TEMPLATE,
+    AUTH_REQUEST_SNIPPET_TEMPLATE,
+    AUTH_REQUEST_LOCATION_TEMPLATE,
+    AUTH_REQUEST_CACHE_DIRECTIVES_TEMPLATE,
+    AUTH_REQUEST_CACHE_ZONE_TEMPLATE,
+)
+from utilities.acl import AclCompiler
 from utilities.logger import create_logger
+from utilities.metrics import Metrics
 
 DOTENV_PATH = ".env"
 DEFAULT_NGINX_PATH = "/etc/nginx"
@@ -12,6 +21,17 @@ DEFAULT_NGINX_PATH = "/etc/nginx"
 load_dotenv(DOTENV_PATH)
 
 SERVER_NAME = os.getenv("SERVER_NAME")
+ACL_OUTPUT_MODE = os.getenv("ACL_OUTPUT_MODE", "files").strip().lower() or "files"
+ACL_GEO_FILE = os.getenv("ACL_GEO_FILE", "conf.d/rpacm-acl-geo.conf").strip() or "conf.d/rpacm-acl-geo.conf"
+PUBLIC_API_HOST = os.getenv("PUBLIC_API_HOST")
+PUBLIC_API_PORT = os.getenv("PUBLIC_API_PORT")
+AUTH_REQUEST_LOCATION = "/.rpacm-authorize"
+AUTH_REQUEST_CACHE_SECONDS = int(os.getenv("AUTH_REQUEST_CACHE_SECONDS", 5))
+AUTH_REQUEST_CACHE_PATH = os.getenv("AUTH_REQUEST_CACHE_PATH", "/var/cache/nginx/rpacm-auth").strip()
+AUTH_REQUEST_CACHE_ZONE = "rpacm_auth"
+AUTH_REQUEST_CACHE_FILE = "conf.d/rpacm-auth-cache.conf"
+AUTH_REQUEST_LOCATION_FILE = "snippets/rpacm-authorize.conf"
+ACL_AGGREGATE_CIDRS = os.getenv("ACL_AGGREGATE_CIDRS", "True").strip().lower() in ("1", "true", "yes")
 
 log = create_logger(logger_name="ProxyListener_util_nginx", alias="nginx")
 
@@ -30,7 +50,7 @@ class Nginx:
         if custom_path:
             set_key(DOTENV_PATH, "NGINX_PATH", custom_path)
 
-        for subdir in ("sites-available", "sites-enabled", "allowed-ips"):
+        for subdir in ("sites-available", "sites-enabled", "allowed-ips", os.path.dirname(ACL_GEO_FILE), os.path.dirname(AUTH_REQUEST_CACHE_FILE), os.path.dirname(AUTH_REQUEST_LOCATION_FILE)):
 
             full = os.path.join(path, subdir)
 
@@ -181,34 +201,255 @@ class Nginx:
         return available
 
     @staticmethod
-    def address_whitelist_config_generator(nginx_path: str, services: list[dict], connections: list[dict]) -> None:
-        """Generate a Nginx configuration file for the address whitelist."""
+    def whitelist_path(nginx_path: str, service_name: str) -> str:
+        """Path of a service's ``allowed-ips/<service>.ips`` include.
+
+        Wildcard (``*.apps.example.com``) and suffix (``.example.com``) services get
+        ``_wildcard.apps.example.com.ips`` and ``_suffix.example.com.ips``: a literal
+        ``*`` would make nginx treat the include as a glob. Path-prefix services
+        (``tools.example.com/grafana``) get ``tools.example.com~grafana.ips``, to be
+        included in the matching ``location`` block.
+        """
+
+        service_name = "~".join(segment for segment in service_name.split("/") if segment)
+
+        if service_name.startswith("*."):
+            service_name = "_wildcard" + service_name[1:]
+        elif service_name.startswith("."):
+            service_name = "_suffix" + service_name
+
+        return os.path.join(nginx_path, "allowed-ips", service_name + ".ips")
+
+    @staticmethod
+    def render_address_whitelist(rules: list) -> str:
+        """Render one service's ``allow`` list (addresses or CIDR blocks, already sorted) followed by ``deny all``."""
+
+        lines = [f"allow {rule};" for rule in rules]
+        lines.append("deny all;")
+
+        if SERVER_NAME:
+            lines.append("error_page 403 = " + SERVER_NAME + "/;")
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def geo_variable(service_name: str) -> str:
+        """Name of the nginx variable set to ``1`` for clients allowed on ``service_name`` (geo mode)."""
+        return f"rpacm_acl_{AclCompiler.identifier(service_name)}"
+
+    @staticmethod
+    def render_geo_check(service_name: str) -> str:
+        """Render the per-service snippet used in geo mode: deny unless the client matched the geo block."""
+
+        lines = [f"if (${Nginx.geo_variable(service_name)} = 0) {{ return 403; }}"]
+
+        if SERVER_NAME:
+            lines.append("error_page 403 = " + SERVER_NAME + "/;")
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def render_geo_include(rules_by_service: dict[str, list]) -> str:
+        """Render one ``geo`` block per service into a single http-level include.
 
-        for service in services:
+        nginx resolves ``geo`` lookups through a radix tree over ``$remote_addr``.
+        """
+
+        blocks = ["# Generated by proxy-listener. Do not edit by hand."]
+
+        for service_name in sorted(rules_by_service):
+
+            lines = [f"# {service_name}", f"geo ${Nginx.geo_variable(service_name)} {{", "    default 0;"]
+            lines.extend(f"    {rule} 1;" for rule in rules_by_service[service_name])
+            lines.append("}")
+
+            blocks.append("\n".join(lines))
 
-            filename = service['name'] + ".ips"
-            filepath = os.path.join(nginx_path, "allowed-ips", filename)
-            allowed_ips = []
+        return "\n\n".join(blocks) + "\n"
+
+    @staticmethod
+    def render_auth_request_snippet(service_name: str) -> str:
+        """Render the per-service snippet delegating access checks to public-api's `/authorize`.
+
+        It only names the service and points at the shared location from
+        :meth:`render_auth_request_location`, so it can sit in a ``location`` block
+        and several services can share a server. It does not depend on grants, so
+        grant changes never rewrite it or require a reload.
+        """
 
-            for connection in connections:
+        return AUTH_REQUEST_SNIPPET_TEMPLATE.format(
+            service_name=service_name,
+            auth_location=AUTH_REQUEST_LOCATION,
+            error_page=f"error_page 403 = {SERVER_NAME}/;\n" if SERVER_NAME else "",
+        )
 
-                if connection['service_name'] == service['name']:
+    @staticmethod
+    def render_auth_request_location() -> str:
+        """Render the server-level include holding the internal `/authorize` subrequest location."""
 
-                    content = "allow " + connection['ip_address'] + ";"
+        cache_directives = ""
 
-                    if content not in allowed_ips:
-                        allowed_ips.append(content)
+        if AUTH_REQUEST_CACHE_SECONDS > 0:
+            cache_directives = AUTH_REQUEST_CACHE_DIRECTIVES_TEMPLATE.format(
+                cache_zone=AUTH_REQUEST_CACHE_ZONE,
+                cache_seconds=AUTH_REQUEST_CACHE_SECONDS,
+            )
 
-            allowed_ips.append("deny all;")
+        return AUTH_REQUEST_LOCATION_TEMPLATE.format(
+            auth_location=AUTH_REQUEST_LOCATION,
+            backend_host=PUBLIC_API_HOST,
+            backend_port=PUBLIC_API_PORT,
+            cache_directives=cache_directives,
+        )
 
-            if SERVER_NAME:
+    @staticmethod
+    def render_address_whitelists(
+        nginx_path: str,
+        services: list[dict],
+        connections: list[dict],
+        previous_state: dict[str, dict] | None = None,
+        force_paths: set[str] | None = None,
+    ) -> tuple[dict[str, dict], dict[str, str]]:
+        """Render the address whitelist of every service without touching the disk.
+
+        Connections are grouped by ``AclCompiler`` in one pass and each list is
+        emitted in sorted order, so the output only depends on the grant set.
+        With ``ACL_AGGREGATE_CIDRS`` enabled, contiguous addresses are collapsed
+        into the minimal CIDR blocks covering exactly the granted set.
+
+        With ``ACL_OUTPUT_MODE=auth_request`` every ``allowed-ips/<service>.ips``
+        delegates to public-api's ``/authorize`` through the server-level
+        ``AUTH_REQUEST_LOCATION_FILE``; addresses are only tracked in the returned
+        state, so grant changes write nothing and need no reload.
+
+        With ``ACL_OUTPUT_MODE=geo`` every ``allowed-ips/<service>.ips`` becomes a
+        static variable check and all addresses go into the single ``ACL_GEO_FILE``
+        include, so grant changes rewrite one file.
 
-                content = "error_page 403 = " + SERVER_NAME + "/;"
-                allowed_ips.append(content)
+        Args:
+            nginx_path (str): /etc/nginx/
+            services (list[dict]): Services from the private API.
+            connections (list[dict]): Active connections from the private API.
+            previous_state (dict | None): ``{service_name: {"hash": ..., "ips": [...]}}`` last applied.
+            force_paths (set[str] | None): Managed files to re-render even if their state is unchanged,
+                e.g. files edited or deleted outside the listener.
 
-            with open(filepath, "w") as f:
-                f.write("\n".join(allowed_ips))
+        Returns:
+            The new per-service state and ``{filepath: content}`` for files whose hash changed.
+        """
+
+        previous_state = previous_state or {}
+        force_paths = force_paths or set()
+        new_state: dict[str, dict] = {}
+        changed_files: dict[str, str] = {}
+        address_count = 0
+        rule_count = 0
+        geo_mode = ACL_OUTPUT_MODE == "geo"
+        geo_rules: dict[str, list] = {}
+        geo_changed = set(previous_state) != {service["name"] for service in services}
+        geo_path = os.path.join(nginx_path, ACL_GEO_FILE)
+        geo_changed = geo_changed or geo_path in force_paths
+
+        for service_name, addresses in AclCompiler.group_by_service(services, connections).items():
+
+            rules = AclCompiler.collapse(addresses) if ACL_AGGREGATE_CIDRS else addresses
+            address_count += len(addresses)
+            rule_count += len(rules)
+
+            filepath = Nginx.whitelist_path(nginx_path, service_name)
+
+            if geo_mode:
+                geo_rules[service_name] = rules
+                file_content = Nginx.render_geo_check(service_name)
+            elif ACL_OUTPUT_MODE == "auth_request":
+                file_content = Nginx.render_auth_request_snippet(service_name)
+            else:
+                file_content = Nginx.render_address_whitelist(rules)
+
+            content_hash = hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+            ips = [str(address) for address in addresses]
+            previous = previous_state.get(service_name, {})
+
+            new_state[service_name] = {"hash": content_hash, "ips": ips}
+
+            if previous.get("hash") != content_hash or filepath in force_paths:
+                changed_files[filepath] = file_content
+                geo_changed = True
+
+            elif previous.get("ips") != ips:
+                geo_changed = True
+
+        if geo_mode and geo_changed:
+            changed_files[geo_path] = Nginx.render_geo_include(geo_rules)
+
+        location_path = os.path.join(nginx_path, AUTH_REQUEST_LOCATION_FILE)
+
+        if ACL_OUTPUT_MODE == "auth_request":
+            location_content = Nginx.render_auth_request_location()
+            if location_path in force_paths or Nginx.read_config_file(location_path) != location_content:
+                changed_files[location_path] = location_content
+
+        cache_zone_path = os.path.join(nginx_path, AUTH_REQUEST_CACHE_FILE)
+
+        if ACL_OUTPUT_MODE == "auth_request" and AUTH_REQUEST_CACHE_SECONDS > 0 and (
+            cache_zone_path in force_paths or not os.path.isfile(cache_zone_path)
+        ):
+            changed_files[cache_zone_path] = AUTH_REQUEST_CACHE_ZONE_TEMPLATE.format(
+                cache_path=AUTH_REQUEST_CACHE_PATH,
+                cache_zone=AUTH_REQUEST_CACHE_ZONE,
+            )
+
+        Metrics.acl_rules.set(address_count, stage="addresses")
+        Metrics.acl_rules.set(rule_count, stage="rules")
+
+        if ACL_AGGREGATE_CIDRS and address_count:
+            log.info(f"Collapsed {address_count} address(es) into {rule_count} allow rule(s)")
+
+        return new_state, changed_files
+
+    @staticmethod
+    def read_config_file(filepath: str) -> str | None:
+
+        try:
+            with open(filepath, "r") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def write_config_file(filepath: str, content: str) -> str:
+        """Write a single generated config file. Safe to call from a worker thread."""
+
+        with open(filepath, "w") as f:
+            f.write(content)
+
+        Metrics.files_written.inc()
+        log.info(f"Address whitelist config generated at {filepath}")
+
+        return filepath
+
+    @staticmethod
+    def address_whitelist_config_generator(
+        nginx_path: str,
+        services: list[dict],
+        connections: list[dict],
+        previous_state: dict[str, dict] | None = None,
+    ) -> tuple[dict[str, dict], list[str]]:
+        """Generate a Nginx configuration file for the address whitelist.
+
+        Files whose content hash matches ``previous_state`` are left untouched.
+
+        Returns:
+            The new per-service state and the list of file paths that were written.
+        """
+
+        new_state, changed_files = Nginx.render_address_whitelists(
+            nginx_path=nginx_path,
+            services=services,
+            connections=connections,
+            previous_state=previous_state,
+        )
 
-            log.info(f"Address whitelist config generated at {filepath}")
+        written = [Nginx.write_config_file(filepath, content) for filepath, content in changed_files.items()]
 
-        return
+        return new_state, written
@@ -1,15 +1,22 @@
 import os
 import time
+import threading
 from dotenv import load_dotenv
 from utilities.nginx import Nginx
+from utilities.nftables import Nftables
+from utilities.reload import ReloadController
+from utilities.state import AppliedState
+from utilities.drift import DriftWatcher
 from utilities.backend import Backend
 from utilities.logger import create_logger
+from utilities.metrics import Metrics
 
 DOTENV_FILE = ".env"
 
 load_dotenv(DOTENV_FILE)
 
 POLLING_INTERVAL = int(os.getenv("POLLING_INTERVAL", 60))
+ACL_BACKEND = os.getenv("ACL_BACKEND", "nginx").strip().lower() or "nginx"
 
 log = create_logger(logger_name="ProxyListener_util_polling", alias="Polling")
 
@@ -19,75 +26,227 @@ class PollingAndProcessing:
     def __init__(self, nginx_path: str, private_api: Backend) -> None:
         self.nginx_path = nginx_path
         self.private_api = private_api
+        self.reload_controller = ReloadController()
+        self.applied_state = AppliedState()
+        self.applied_state.load()
+        self._previous_fetch_connections: list[dict] = []
+        self._had_failure = False
+        self._nft_services: list[tuple] | None = None
+        self._nft_sets: dict[str, set[str]] = {}
+        self._drifted: set[str] = set()
+        self._drift_lock = threading.Lock()
+        self.drift_watcher = DriftWatcher(nginx_path, self.applied_state, self._on_drift)
 
     def _fetch_all_services(self) -> list[dict] | None:
 
         try:
-            all_services = self.private_api.get_service_list()
+            with Metrics.fetch_duration.time(resource="services"):
+                all_services = self.private_api.get_service_list()
             log.debug(f"Fetched {len(all_services)} service(s)")
+            Metrics.services.set(len(all_services))
             return all_services
         except Exception as e:
             log.error(f"Failed to fetch services: {e}")
+            Metrics.fetch_failures.inc(resource="services")
             return None
 
-    def _fetch_all_connections(self, all_services: list[dict]) -> list[dict] | None:
+    def _fetch_all_connections(self, all_services: list[dict] | None = None) -> list[dict] | None:
 
         try:
-            all_connections = self.private_api.get_connection_list(all_services=all_services)
+            with Metrics.fetch_duration.time(resource="connections"):
+                all_connections = self.private_api.get_connection_list(all_services=all_services)
             log.debug(f"Fetched {len(all_connections)} valid connection(s)")
+            Metrics.connections.set(len(all_connections))
             return all_connections
         except Exception as e:
             log.error(f"Failed to fetch connections: {e}")
+            Metrics.fetch_failures.inc(resource="connections")
             return None
 
-    def poll_and_process(self) -> None:
+    def _apply_nftables(self, all_services: list[dict], all_connections: list[dict]) -> bool:
+        """Apply the allow-lists of directly exposed services as nftables sets, reusing the existing table when those are unchanged."""
 
-        log.info(f"Polling started (interval: {POLLING_INTERVAL}s)")
+        direct, skipped = Nftables.direct_services(all_services)
+        services_signature = sorted((service["name"], port) for service, port in direct)
+        current_sets = Nftables.build_sets([service for service, _ in direct], all_connections)
 
-        previous_fetch_connections = []
-        had_failure = False
+        if services_signature != self._nft_services:
+            for reason in skipped:
+                log.error(f"Not enforcing with nftables: {reason}")
+            batch = Nftables.render_ruleset(direct, current_sets)
+        else:
+            batch = Nftables.diff_sets(self._nft_sets, current_sets)
 
-        while True:
+        if not Nftables.apply_batch(batch):
+            return False
+
+        self._nft_services = services_signature
+        self._nft_sets = current_sets
+        return True
+
+    def _reload_nginx(self) -> bool:
+
+        if not self.reload_controller.reload():
+            Metrics.reload_failures.inc()
+            return False
+
+        return True
+
+    def _fetch_succeeded(self, all_services: list[dict] | None, all_connections: list[dict] | None) -> bool:
+        """Log fetch failures/recovery and return whether both lists were fetched."""
+
+        if all_services is None:
+            log.warning("Skipping cycle — could not fetch services")
+            self._had_failure = True
+            return False
+
+        if all_connections is None:
+            log.warning("Skipping cycle — could not fetch connections")
+            self._had_failure = True
+            return False
+
+        if self._had_failure:
+            log.info("Connection to private API resumed")
+            self._had_failure = False
+
+        return True
+
+    def _connections_changed(self, all_connections: list[dict]) -> bool:
+        """Compare with the last connection list that was applied successfully.
+
+        The baseline only moves in :meth:`_mark_applied`, so a change whose apply
+        failed (nginx reload, nft) is still a change on the next cycle and is retried.
+        """
+
+        if self._previous_fetch_connections == all_connections:
+            return False
+
+        log.info(f"Connection change detected — {len(all_connections)} active connection(s)")
+
+        return True
+
+    def _mark_applied(self, all_connections: list[dict] | None) -> None:
+        """Record the connection list now in effect; None forces the next cycle to apply again."""
+        self._previous_fetch_connections = all_connections
+
+    def _on_drift(self, paths: set[str]) -> None:
+        """Called from the drift watcher thread; the paths are repaired on the next cycle."""
+
+        with self._drift_lock:
+            self._drifted |= paths
+
+    def _take_drifted(self) -> set[str]:
+
+        with self._drift_lock:
+            drifted, self._drifted = self._drifted, set()
+
+        return drifted
+
+    def _restore_drifted(self, drifted: set[str]) -> None:
+        """Hand back drift a failed cycle did not repair, so the next cycle tries again."""
+
+        with self._drift_lock:
+            self._drifted |= drifted
+
+    def _prepare_writes(self, changed_files: dict[str, str], drifted: set[str]) -> None:
+        """Record the hashes of files about to be written and account for repaired drift."""
 
-            all_services = self._fetch_all_services()
+        self.applied_state.record_files(changed_files)
 
-            if all_services is None:
-                log.warning("Skipping cycle — could not fetch services")
-                had_failure = True
-                time.sleep(POLLING_INTERVAL)
-                continue
+        if not drifted:
+            return
 
-            all_connections = self._fetch_all_connections(all_services)
+        repaired = drifted & changed_files.keys()
+        Metrics.drift_repairs.inc(len(repaired))
 
-            if all_connections is None:
-                log.warning("Skipping cycle — could not fetch connections")
-                had_failure = True
-                time.sleep(POLLING_INTERVAL)
-                continue
+        if repaired:
+            log.warning(f"Repairing {len(repaired)} drifted file(s) from the applied state")
 
-            if had_failure:
-                log.info("Connection to private API resumed")
-                had_failure = False
+        # Drifted files that were not re-rendered belong to services that no longer exist.
+        self.applied_state.forget_files(drifted - repaired)
 
-            if previous_fetch_connections == all_connections:
-                time.sleep(POLLING_INTERVAL)
-                continue
+    def _save_applied_state(self, new_state: dict[str, dict]) -> None:
 
-            log.info(f"Connection change detected — {len(all_connections)} active connection(s)")
-            previous_fetch_connections = all_connections
+        self.applied_state.update(new_state)
+        self.applied_state.save()
 
-            if not all_connections:
-                log.info("Connection list is now empty, skipping nginx update")
-                time.sleep(POLLING_INTERVAL)
-                continue
+    def _process_cycle(self) -> bool:
+        """Run one fetch-compare-apply cycle. Returns True when the cycle synced successfully."""
+
+        all_services = self._fetch_all_services()
+        all_connections = self._fetch_all_connections(all_services) if all_services is not None else None
+
+        if not self._fetch_succeeded(all_services, all_connections):
+            return False
+
+        drifted = self._take_drifted()
+
+        if not self._connections_changed(all_connections) and not drifted:
+            return True
+
+        synced = self._apply_changes(all_services, all_connections, drifted)
+
+        if synced:
+            self._mark_applied(all_connections)
+        else:
+            self._restore_drifted(drifted)
+
+        return synced
+
+    def _apply_changes(self, all_services: list[dict], all_connections: list[dict], drifted: set[str]) -> bool:
+        """Write, reload and persist the new allow-lists. Returns True once they are in effect."""
+
+        # nftables covers directly exposed services only; proxied services always keep the nginx ACL.
+        if ACL_BACKEND == "nftables" and not self._apply_nftables(all_services, all_connections):
+            return False
+
+        if not all_connections and not drifted:
+            log.info("Connection list is now empty, skipping nginx update")
+            return True
+
+        new_state, changed_files = Nginx.render_address_whitelists(
+            nginx_path=self.nginx_path,
+            services=all_services,
+            connections=all_connections,
+            previous_state=self.applied_state.services,
+            force_paths=drifted,
+        )
+
+        self._prepare_writes(changed_files, drifted)
+
+        if not changed_files:
+            log.info("Whitelist configs already match the applied state, skipping reload")
+            if new_state != self.applied_state.services or drifted:
+                self._save_applied_state(new_state)
+            return True
+
+        for filepath, content in changed_files.items():
+            Nginx.write_config_file(filepath, content)
+
+        log.info(f"Nginx whitelist configs updated ({len(changed_files)} file(s)), reloading nginx")
+
+        if not self._reload_nginx():
+            return False
+
+        self._save_applied_state(new_state)
+
+        return True
+
+    def poll_and_process(self) -> None:
+
+        log.info(f"Polling started (interval: {POLLING_INTERVAL}s, backend: {ACL_BACKEND})")
+
+        if self.drift_watcher is not None:
+            self.drift_watcher.start()
+
+        while True:
 
-            Nginx.address_whitelist_config_generator(
-                nginx_path=self.nginx_path,
-                services=all_services,
-                connections=all_connections,
-            )
-            log.info("Nginx whitelist configs updated, reloading nginx")
+            with Metrics.poll_duration.time():
+                synced = self._process_cycle()
 
-            Nginx.nginx_run("-s", "reload")
+            if synced:
+                Metrics.mark_success()
+            else:
+                Metrics.syncs.inc(result="failure")
 
             time.sleep(POLLING_INTERVAL)
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import signal
+import socket
+import http.client
+from urllib.parse import quote
+from dotenv import load_dotenv
+from utilities.nginx import Nginx
+from utilities.logger import create_logger
+from utilities.metrics import Metrics
+
+DOTENV_PATH = ".env"
+
+load_dotenv(DOTENV_PATH)
+
+NGINX_PID_FILE = os.getenv("NGINX_PID_FILE", "").strip()
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", "/var/run/docker.sock").strip() or "/var/run/docker.sock"
+DEFAULT_PID_FILES = ("/run/nginx.pid", "/var/run/nginx.pid", "/usr/local/nginx/logs/nginx.pid")
+
+log = create_logger(logger_name="ProxyListener_util_reload", alias="Reload")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket (for the Docker Engine API)."""
+
+    def __init__(self, socket_path: str, timeout: float = 5):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self._socket_path)
+        self.sock = sock
+
+
+class ReloadController:
+    """Reload nginx by signalling its master process directly.
+
+    The target is resolved once and cached:
+
+    1. Native: the master PID from ``NGINX_PID_FILE`` or a default pid file,
+       reloaded with ``os.kill(pid, SIGHUP)``.
+    2. Docker: the container running nginx, reloaded through the Docker Engine
+       API (``POST /containers/{id}/kill?signal=HUP``) on ``DOCKER_SOCKET``.
+       The official image runs the nginx master as the container's PID 1.
+
+    A bare SIGHUP is accepted even when the master then rejects the new
+    configuration, so the configuration is tested with ``nginx -t`` first (in
+    Docker mode through an Engine API exec) and a failing test fails the reload,
+    as ``nginx -s reload`` would.
+
+    If no target can be resolved, or signalling fails, the controller falls
+    back to ``Nginx.nginx_run("-s", "reload")``. The duration of the whole
+    request (config test and signal, or the subprocess) is recorded in
+    ``rpacm_listener_reload_duration_seconds{mode=...}``; nginx finishes
+    swapping workers after that.
+    """
+
+    def __init__(self) -> None:
+        self._pid: int | None = None
+        self._container_id: str | None = None
+        self._resolved = False
+
+    @property
+    def mode(self) -> str:
+
+        if self._pid is not None:
+            return "pid"
+
+        if self._container_id is not None:
+            return "docker"
+
+        return "subprocess"
+
+    def resolve(self) -> str:
+        """Locate the nginx master (pid file, then Docker socket). Returns the resulting mode."""
+
+        self._pid = self._resolve_pid()
+
+        if self._pid is None:
+            self._container_id = self._resolve_container()
+
+        self._resolved = True
+
+        if self._pid is not None:
+            log.info(f"Reloading nginx via SIGHUP to master PID {self._pid}")
+        elif self._container_id is not None:
+            log.info(f"Reloading nginx via Docker Engine API (container {self._container_id[:12]})")
+        else:
+            log.info("No nginx master PID or container found, reloading via subprocess")
+
+        return self.mode
+
+    def reload(self) -> bool:
+        """Reload nginx, falling back to the subprocess path if signalling fails.
+
+        Returns:
+            True if the configuration passed ``nginx -t`` and the reload was delivered.
+        """
+
+        if not self._resolved:
+            self.resolve()
+
+        mode = self.mode
+
+        if mode != "subprocess":
+
+            started = time.perf_counter()
+
+            if not self._test_config():
+                return False
+
+            if self._signal():
+                elapsed = time.perf_counter() - started
+                Metrics.reload_duration.observe(elapsed, mode=mode)
+                log.debug(f"Nginx config tested and reload signalled ({mode}) in {elapsed * 1000:.1f}ms")
+                return True
+
+            log.warning(f"Signalling nginx ({mode}) failed, falling back to subprocess and re-resolving next time")
+            self._resolved = False
+            self._pid = None
+            self._container_id = None
+
+        return self._reload_subprocess()
+
+    def _test_config(self) -> bool:
+        """Run ``nginx -t`` where the master runs. Returns False if the config is rejected or cannot be tested."""
+
+        if self._container_id is not None:
+            exit_code, output = self._docker_exec(self._container_id, ["nginx", "-t"])
+        else:
+            try:
+                result = Nginx.nginx_run("-t")
+            except RuntimeError as e:
+                log.error(f"Cannot test the nginx config before reloading: {e}. Set NGINX_BINARY so `nginx -t` can run")
+                return False
+            exit_code, output = (result.returncode, result.stderr) if result is not None else (None, "no output")
+
+        if exit_code != 0:
+            log.error(f"Nginx config test failed, not reloading: {output.strip() if output else exit_code}")
+            return False
+
+        return True
+
+    def _signal(self) -> bool:
+
+        if self._pid is not None:
+
+            try:
+                os.kill(self._pid, signal.SIGHUP)
+                return True
+            except (ProcessLookupError, PermissionError) as e:
+                log.warning(f"Cannot signal PID {self._pid}: {e}")
+                return False
+
+        status, _ = self._docker_request("POST", f"/containers/{self._container_id}/kill?signal=HUP")
+        return status == 204
+
+    def _reload_subprocess(self) -> bool:
+
+        started = time.perf_counter()
+
+        try:
+            result = Nginx.nginx_run("-s", "reload")
+        except RuntimeError as e:
+            log.error(f"Nginx reload failed: {e}")
+            result = None
+
+        Metrics.reload_duration.observe(time.perf_counter() - started, mode="subprocess")
+
+        if result is None or result.returncode != 0:
+            log.error(f"Nginx reload failed: {result.stderr if result else 'no output'}")
+            return False
+
+        return True
+
+    @staticmethod
+    def _resolve_pid() -> int | None:
+
+        candidates = (NGINX_PID_FILE,) if NGINX_PID_FILE else DEFAULT_PID_FILES
+
+        for pid_file in candidates:
+
+            try:
+                with open(pid_file, "r") as f:
+                    pid = int(f.read().strip())
+            except (OSError, ValueError):
+                continue
+
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                log.debug(f"Stale pid file {pid_file} (PID {pid})")
+                continue
+            except PermissionError:
+                log.debug(f"PID {pid} from {pid_file} exists but cannot be signalled by this user")
+                continue
+
+            return pid
+
+        return None
+
+    @staticmethod
+    def _resolve_container() -> str | None:
+
+        if not os.path.exists(DOCKER_SOCKET):
+            return None
+
+        # Prefer the container saved by Nginx.nginx_run ("docker exec <name> nginx").
+        saved = os.environ.get("NGINX_BINARY", "").split()
+
+        if len(saved) >= 3 and saved[:2] == ["docker", "exec"]:
+
+            status, body = ReloadController._docker_request("GET", f"/containers/{quote(saved[2])}/json")
+
+            if status == 200 and body.get("State", {}).get("Running"):
+                return body.get("Id")
+
+        filters = quote(json.dumps({"ancestor": ["nginx"], "status": ["running"]}))
+        status, body = ReloadController._docker_request("GET", f"/containers/json?filters={filters}")
+
+        if status == 200 and body:
+            return body[0].get("Id")
+
+        return None
+
+    @staticmethod
+    def _docker_exec(container_id: str, cmd: list[str]) -> tuple[int | None, str]:
+        """Run `cmd` in the container through the Engine API and wait for it. Returns (exit code, output)."""
+
+        status, body = ReloadController._docker_request(
+            "POST",
+            f"/containers/{container_id}/exec",
+            {"Cmd": cmd, "AttachStdout": True, "AttachStderr": True},
+        )
+
+        if status != 201:
+            return None, f"exec create returned HTTP {status}"
+
+        exec_id = body.get("Id")
+        status, output = ReloadController._docker_request("POST", f"/exec/{exec_id}/start", {"Detach": False, "Tty": False})
+
+        if status != 200:
+            return None, f"exec start returned HTTP {status}"
+
+        status, inspect = ReloadController._docker_request("GET", f"/exec/{exec_id}/json")
+
+        if status != 200:
+            return None, f"exec inspect returned HTTP {status}"
+
+        return inspect.get("ExitCode"), ReloadController._demux_stream(output.get("raw", b"") if isinstance(output, dict) else b"")
+
+    @staticmethod
+    def _demux_stream(raw: bytes) -> str:
+        """Join the frames of a Docker stdout/stderr stream (8-byte header: stream, 0, 0, 0, big-endian size)."""
+
+        chunks = []
+        offset = 0
+
+        while offset + 8 <= len(raw):
+            size = int.from_bytes(raw[offset + 4:offset + 8], "big")
+            chunks.append(raw[offset + 8:offset + 8 + size])
+            offset += 8 + size
+
+        return b"".join(chunks).decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _docker_request(method: str, path: str, payload: dict | None = None) -> tuple[int, dict | list]:
+
+        connection = _UnixHTTPConnection(DOCKER_SOCKET)
+
+        try:
+            if payload is None:
+                connection.request(method, path)
+            else:
+                connection.request(method, path, body=json.dumps(payload), headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            raw = response.read()
+        except OSError as e:
+            log.warning(f"Docker Engine API request failed ({method} {path}): {e}")
+            return 0, {}
+        finally:
+            connection.close()
+
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            # Attached exec output is a raw stream, not JSON.
+            body = {"raw": raw}
+
+        return response.status, body
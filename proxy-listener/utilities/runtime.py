@@ -0,0 +1,218 @@
+import os
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utilities.nginx import Nginx
+from utilities.backend import Backend
+from utilities.logger import create_logger
+from utilities.metrics import Metrics
+from utilities.polling import PollingAndProcessing, POLLING_INTERVAL, ACL_BACKEND
+
+DOTENV_FILE = ".env"
+
+load_dotenv(DOTENV_FILE)
+
+FILE_WRITER_WORKERS = int(os.getenv("FILE_WRITER_WORKERS", 4))
+
+log = create_logger(logger_name="ProxyListener_util_runtime", alias="Runtime")
+
+
+class AsyncPollingRuntime(PollingAndProcessing):
+    """Asyncio runtime for the listener.
+
+    Compared to :meth:`PollingAndProcessing.poll_and_process`:
+
+    - services and connections are fetched concurrently;
+    - changed ACL files are written in parallel on a thread pool;
+    - the nginx reload runs as a background task, so the next fetch can start
+      while it is in flight. Changes applied during a reload are coalesced into
+      one follow-up reload. The connection baseline only moves once a reload
+      succeeds; a failed reload falls back to the applied state so the next
+      cycle writes and reloads again;
+    - the polling timer, push triggers (:meth:`trigger`, ``SIGUSR1``), drift
+      repairs and the reload task all run on one event loop.
+    """
+
+    def __init__(self, nginx_path: str, private_api: Backend, workers: int = FILE_WRITER_WORKERS) -> None:
+        super().__init__(nginx_path=nginx_path, private_api=private_api)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="acl-writer")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._reload_task: asyncio.Task | None = None
+        self._reload_state: dict[str, dict] | None = None
+        self._reload_connections: list[dict] | None = None
+        self._reload_drifted: set[str] = set()
+
+    def trigger(self, reason: str = "push") -> None:
+        """Request an immediate sync. Safe to call from any thread."""
+
+        if self._loop is None:
+            return
+
+        log.debug(f"Sync triggered ({reason})")
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _on_drift(self, paths: set[str]) -> None:
+        super()._on_drift(paths)
+        self.trigger("drift")
+
+    async def _run_in_executor(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    async def _save_applied_state_async(self, new_state: dict[str, dict]) -> None:
+        """Update and serialize the state on the loop thread; only the file write runs on the pool.
+
+        Cycles mutate ``applied_state.files`` on the loop (:meth:`_prepare_writes`),
+        so the record must not be read from a worker thread.
+        """
+
+        self.applied_state.update(new_state)
+        await self._run_in_executor(self.applied_state.write, self.applied_state.snapshot())
+
+    async def _process_cycle_async(self) -> bool:
+
+        all_services, all_connections = await asyncio.gather(
+            self._run_in_executor(self._fetch_all_services),
+            self._run_in_executor(self._fetch_all_connections),
+        )
+
+        if not self._fetch_succeeded(all_services, all_connections):
+            return False
+
+        drifted = self._take_drifted()
+
+        if not self._connections_changed(all_connections) and not drifted:
+            return True
+
+        # nftables covers directly exposed services only; proxied services always keep the nginx ACL.
+        if ACL_BACKEND == "nftables" and not await self._run_in_executor(self._apply_nftables, all_services, all_connections):
+            self._restore_drifted(drifted)
+            return False
+
+        if not all_connections and not drifted:
+            log.info("Connection list is now empty, skipping nginx update")
+            if self._reload_state is None:
+                self._mark_applied(all_connections)
+            return True
+
+        # Compare against the state a queued reload is about to persist, so a change
+        # that is still being reloaded is not written twice.
+        previous_state = self._reload_state if self._reload_state is not None else self.applied_state.services
+
+        new_state, changed_files = Nginx.render_address_whitelists(
+            nginx_path=self.nginx_path,
+            services=all_services,
+            connections=all_connections,
+            previous_state=previous_state,
+            force_paths=drifted,
+        )
+
+        self._prepare_writes(changed_files, drifted)
+
+        if not changed_files:
+            log.info("Whitelist configs already match the applied state, skipping reload")
+
+            if self._reload_state is not None:
+                # The queued reload already covers these files; it persists the state and
+                # moves the baseline once nginx has picked them up.
+                if new_state != self._reload_state:
+                    self._reload_state = new_state
+                self._reload_connections = all_connections
+                self._reload_drifted |= drifted
+                return True
+
+            if new_state != self.applied_state.services or drifted:
+                await self._save_applied_state_async(new_state)
+
+            self._mark_applied(all_connections)
+            return True
+
+        await asyncio.gather(*(
+            self._run_in_executor(Nginx.write_config_file, filepath, content)
+            for filepath, content in changed_files.items()
+        ))
+
+        log.info(f"Nginx whitelist configs updated ({len(changed_files)} file(s)), scheduling reload")
+        self._schedule_reload(new_state, all_connections, drifted)
+
+        return True
+
+    def _schedule_reload(self, new_state: dict[str, dict], all_connections: list[dict], drifted: set[str]) -> None:
+
+        self._reload_state = new_state
+        self._reload_connections = all_connections
+        self._reload_drifted |= drifted
+
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(self._reload_worker())
+
+    async def _reload_worker(self) -> None:
+        """Reload until no newer state is waiting; each pass covers every file written before it started."""
+
+        while self._reload_state is not None:
+
+            state = self._reload_state
+
+            if not await self._run_in_executor(self._reload_nginx):
+                # Whatever was written since the last good reload is not live. Forget the
+                # queued state and baseline, so the next cycle renders against the applied
+                # state, rewrites the files and reloads again.
+                self._restore_drifted(self._reload_drifted)
+                self._reload_state, self._reload_connections, self._reload_drifted = None, None, set()
+                self._mark_applied(None)
+                return
+
+            await self._save_applied_state_async(state)
+
+            if self._reload_state is state:
+                self._mark_applied(self._reload_connections)
+                self._reload_state, self._reload_connections, self._reload_drifted = None, None, set()
+
+    def _install_signal_handlers(self) -> None:
+
+        try:
+            self._loop.add_signal_handler(signal.SIGUSR1, self.trigger, "SIGUSR1")
+        except (NotImplementedError, AttributeError, RuntimeError):
+            # Windows has neither SIGUSR1 nor loop signal handlers.
+            log.debug("SIGUSR1 trigger unavailable on this platform")
+
+    async def run(self) -> None:
+
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._install_signal_handlers()
+
+        if self.drift_watcher is not None:
+            self.drift_watcher.start()
+
+        log.info(f"Async polling started (interval: {POLLING_INTERVAL}s, backend: {ACL_BACKEND})")
+
+        try:
+
+            while True:
+
+                self._wakeup.clear()
+
+                with Metrics.poll_duration.time():
+                    synced = await self._process_cycle_async()
+
+                if synced:
+                    Metrics.mark_success()
+                else:
+                    Metrics.syncs.inc(result="failure")
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLLING_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+        finally:
+
+            if self._reload_task is not None:
+                await asyncio.gather(self._reload_task, return_exceptions=True)
+
+            self._executor.shutdown(wait=True)
+
+    def poll_and_process(self) -> None:
+        asyncio.run(self.run())
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+from utilities.logger import create_logger
+
+DOTENV_PATH = ".env"
+
+load_dotenv(DOTENV_PATH)
+
+LISTENER_STATE_PATH = os.getenv("LISTENER_STATE_PATH", "data/state.json")
+STATE_FORMAT_VERSION = 1
+
+log = create_logger(logger_name="ProxyListener_util_state", alias="State")
+
+
+class AppliedState:
+    """Last ACL state applied to nginx, persisted so restarts can skip unchanged work.
+
+    The record is a small JSON document::
+
+        {
+            "version": 1,
+            "revision": 12,
+            "applied_at": 1700000000.0,
+            "services": {"jellyfin.example.com": {"hash": "<sha256>", "ips": ["203.0.113.10"]}},
+            "files": {"/etc/nginx/allowed-ips/jellyfin.example.com.ips": "<sha256>"}
+        }
+
+    ``files`` holds the content hash of every managed file as last written, and
+    is what drift detection compares the disk against. The drift watcher reads it
+    from its own thread, so it is only changed and copied under ``lock``.
+
+    ``revision`` increases on every applied change. It is written atomically
+    (temp file + ``os.replace``) after nginx has been reloaded, so a crash mid-cycle
+    leaves the previous record in place and the next start re-applies.
+    """
+
+    def __init__(self, path: str = LISTENER_STATE_PATH) -> None:
+        self.path = path
+        self.revision = 0
+        self.applied_at: float | None = None
+        self.services: dict[str, dict] = {}
+        self.files: dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Load the record from disk. Returns False (and starts empty) if missing or unreadable."""
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            log.info(f"No applied state at {self.path}, the first sync will write every ACL file")
+            return False
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring unreadable applied state at {self.path}: {e}")
+            return False
+
+        if not isinstance(raw, dict) or raw.get("version") != STATE_FORMAT_VERSION:
+            log.warning(f"Ignoring applied state at {self.path} with unsupported format")
+            return False
+
+        self.revision = int(raw.get("revision", 0))
+        self.applied_at = raw.get("applied_at")
+        self.services = raw.get("services") or {}
+        self.files = raw.get("files") or {}
+
+        log.info(f"Loaded applied state revision {self.revision} ({len(self.services)} service(s))")
+        return True
+
+    def update(self, services: dict[str, dict]) -> None:
+        """Replace the per-service record with a newly applied one and bump the revision."""
+
+        self.services = services
+        self.revision += 1
+        self.applied_at = time.time()
+
+    def record_files(self, changed_files: dict[str, str]) -> None:
+        """Remember the hashes of files about to be written, before they hit the disk."""
+
+        hashes = {filepath: hashlib.sha256(content.encode("utf-8")).hexdigest() for filepath, content in changed_files.items()}
+
+        with self.lock:
+            self.files.update(hashes)
+
+    def forget_files(self, filepaths: set[str]) -> None:
+        """Stop tracking files that are no longer managed."""
+
+        with self.lock:
+            for filepath in filepaths:
+                self.files.pop(filepath, None)
+
+    def files_snapshot(self) -> dict[str, str]:
+        """Copy of ``files``, safe to take from another thread."""
+
+        with self.lock:
+            return dict(self.files)
+
+    def snapshot(self) -> str:
+        """Serialize the record now, so it can be written later from another thread."""
+
+        payload = {
+            "version": STATE_FORMAT_VERSION,
+            "revision": self.revision,
+            "applied_at": self.applied_at,
+            "services": self.services,
+            "files": self.files,
+        }
+
+        return json.dumps(payload, separators=(",", ":"), sort_keys=True)
+
+    def write(self, snapshot: str) -> None:
+        """Atomically replace the record on disk with a :meth:`snapshot`."""
+
+        directory = os.path.dirname(self.path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+
+        os.replace(temp_path, self.path)
+        log.debug(f"Applied state saved to {self.path}")
+
+    def save(self) -> None:
+        self.write(self.snapshot())
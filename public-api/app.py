@@ -2,20 +2,26 @@ import os
 import time
 import uvicorn
 from pathlib import Path
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from pydantic import BaseModel, IPvAnyAddress, Field
-from common_custom.controllers.database import Database
-from common_custom.utils.webhook_events import Events
+from common_custom.controllers.database import database as mongodb_helper
+from common_custom.utils.webhook_events import Events, webhook_outbox, service_catalog
+from common_custom.utils.webhook_client import webhook_client
+from common_custom.utils.access_decisions import AccessDecisionTable
+from common_custom.utils.static_assets import StaticAssets
+from common_custom.utils.rate_limiter import RateLimiter, parse_rate
+from common_custom.utils.geoip import geoip
+from common_custom.utils.logger import create_logger
 from common_custom.utils.contact_fields import (
     contact_fields_to_response,
     ensure_contact_fields_file,
     load_contact_fields_config,
 )
-from common_custom.utils.service_matching import find_service_for_redirect
 from common_custom.utils.pydantic.contact_fields_models import ContactFieldsConfigResponseModel
-from fastapi import FastAPI, status, HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, status, HTTPException, Request, Depends
+from fastapi.responses import JSONResponse, Response
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from common_custom.controllers.pydantic.service_models import ServiceItem
 from common_custom.utils.pydantic.health_models import StatusResponseModel
@@ -28,25 +34,59 @@ CONTACT_FIELDS_PATH = DATA_DIR / "contact-fields.json"
 
 load_dotenv(DATA_DIR / ".env")
 
+log = create_logger(alias="PublicAPI", logger_name="public_api")
 
 ensure_contact_fields_file(CONTACT_FIELDS_PATH)
 
 SERVICE_VERSION = os.getenv("SERVICE_VERSION")
 SERVICE_UNDER_MAINTENANCE = os.getenv("SERVICE_UNDER_MAINTENANCE") == 'True'
 
-mongodb_helper = Database(
-    db_path=os.getenv("SQLITE_DB_PATH") or str(DATA_DIR / "app.db")
+# Per-client token buckets ("<requests>/<seconds>"); IPv6 clients are grouped per /64.
+rate_limiter = RateLimiter(
+    limits={
+        "request_access": parse_rate(os.getenv("RATE_LIMIT_REQUEST_ACCESS"), (10, 60)),
+        "check_access": parse_rate(os.getenv("RATE_LIMIT_CHECK_ACCESS"), (60, 60)),
+    },
+    max_buckets=int(os.getenv("RATE_LIMIT_MAX_BUCKETS", 10000)),
+    enabled=os.getenv("RATE_LIMIT_ENABLED") != 'False',
 )
 
-mongodb_helper.connect()
+# Peers whose X-Forwarded-For is applied (addresses or CIDRs, comma-separated). The rate
+# limiter, pending requests and /authorize all use the resulting client address.
+FORWARDED_ALLOW_IPS = [host.strip() for host in (os.getenv("FORWARDED_ALLOW_IPS") or "*").split(",") if host.strip()]
+
+# Uvicorn worker processes; each opens its own database connection in the lifespan.
+PUBLIC_API_WORKERS = int(os.getenv("PUBLIC_API_WORKERS", 1))
+
+access_decisions = AccessDecisionTable(mongodb_helper, service_catalog)
 
 STATIC_ROOT = (Path(__file__).resolve().parent / "frontend" / "dist").resolve()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+
+    if rate_limiter.enabled and "*" in FORWARDED_ALLOW_IPS:
+        log.warning(
+            "Rate limiting is enabled but X-Forwarded-For is trusted from any peer, so a client that "
+            "reaches the API directly can pick a new rate-limit bucket per request. Set FORWARDED_ALLOW_IPS "
+            "to the address(es) nginx connects from (e.g. 127.0.0.1,::1 or its Docker network)"
+        )
+
+    mongodb_helper.connect()
+    await webhook_outbox.start()
+    yield
+    await webhook_outbox.stop()
+    await webhook_client.aclose()
+    mongodb_helper.close()
+
+
 app = FastAPI(
     title="Reverse-Proxy-Access-Control-Guests",
+    lifespan=lifespan,
 )
 
-app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])
+app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=FORWARDED_ALLOW_IPS)
 
 
 class AccessRequest(BaseModel):
@@ -122,12 +162,33 @@ async def service_status():
     return status_reponse
 
 
+@app.get(
+    "/status/rate-limits",
+    tags=['Health'],
+    summary="Rate limiter counters per route",
+    response_model=dict[str, dict[str, int]]
+)
+async def rate_limit_status():
+    return rate_limiter.stats()
+
+
+@app.get(
+    "/status/geoip",
+    tags=['Health'],
+    summary="GeoIP database availability and lookup cache counters",
+    response_model=dict[str, int | bool]
+)
+async def geoip_status():
+    return geoip.stats()
+
+
 @app.post(
     "/request-access",
     tags=['Regular'],
     summary="Request access to a service",
     response_model=RequestAccessResponseModel,
-    status_code=status.HTTP_201_CREATED
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limiter.limit("request_access"))]
 )
 async def request_access_landing(access_request: AccessRequest, request: Request):
 
@@ -159,7 +220,7 @@ async def request_access_landing(access_request: AccessRequest, request: Request
 
     if user_requested_services is not None:
 
-        valid_service_names = set(await mongodb_helper.list_service_names())
+        valid_service_names = await service_catalog.names()
 
         ignored_services: list[str] = []
         for service in user_requested_services:
@@ -205,6 +266,9 @@ async def request_access_landing(access_request: AccessRequest, request: Request
                 },
             )
 
+        # One lookup per request, shared by every pending row it creates.
+        geo = geoip.lookup(remote_str)
+
         for service in user_requested_services:
 
             if service.name in valid_service_names:
@@ -223,7 +287,8 @@ async def request_access_landing(access_request: AccessRequest, request: Request
                     service=service.model_dump(),
                     additional_notes=access_request.note,
                     request_latitude=access_request.location.lat,
-                    request_longitude=access_request.location.lon
+                    request_longitude=access_request.location.lon,
+                    geo=geo,
                 )
 
                 # Trigger event: pending.new
@@ -252,7 +317,7 @@ async def request_access_landing(access_request: AccessRequest, request: Request
 )
 async def list_services():
 
-    available_services = await mongodb_helper.list_all_services()
+    available_services = await service_catalog.services()
 
     return available_services
 
@@ -274,15 +339,13 @@ async def get_contact_fields_config():
     tags=['Regular'],
     summary="Check whether the client IP has access to the service for a redirect URL",
     response_model=CheckAccessResponseModel,
+    dependencies=[Depends(rate_limiter.limit("check_access"))],
 )
 async def check_access(redirect: str, request: Request):
     redirect_url = _parse_redirect_target(redirect)
     remote_str = request.client.host
 
-    service = find_service_for_redirect(
-        await mongodb_helper.list_all_services(),
-        redirect_url,
-    )
+    service = await service_catalog.find_for_redirect(redirect_url)
     if service is None:
         body = CheckAccessResponseModel(
             ip_address=remote_str,
@@ -324,50 +387,67 @@ async def check_access(redirect: str, request: Request):
     return JSONResponse(status_code=status_code, content=body.model_dump(mode="json"))
 
 
-def _frontend_file_response(path_within: str) -> FileResponse:
-    if not STATIC_ROOT.is_dir():
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Frontend not built. Run: cd public-api/frontend && npm install && npm run build",
-        )
-    if path_within:
-        candidate = (STATIC_ROOT / path_within).resolve()
-        try:
-            candidate.relative_to(STATIC_ROOT)
-        except ValueError:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-        if candidate.is_file():
-            return FileResponse(candidate)
-        # Do not fall through to `index.html` for missing Vite bundles under
-        # `assets/` — the browser would mis-parse HTML as JS/CSS and the UI
-        # appears "unstyled" / broken with no clear console hint.
-        if path_within == "assets" or path_within.startswith("assets/"):
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-    index = STATIC_ROOT / "index.html"
-    if not index.is_file():
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Frontend build is incomplete (missing index.html).",
-        )
-    return FileResponse(index)
+@app.get(
+    "/authorize",
+    tags=['Regular'],
+    summary="nginx auth_request target: 204 when the client IP has access to the requested host, else 403",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_class=Response,
+    responses={403: {"description": "The client IP has no active access to this host"}},
+)
+async def authorize(request: Request):
+    # nginx passes the service named by the including snippet in `X-RPACM-Service`,
+    # the protected request's host in `X-Original-Host`, its URI in `X-Original-URI`
+    # (for path-prefix services) and the client address in `X-Forwarded-For`
+    # (applied by ProxyHeadersMiddleware).
+    host = request.headers.get("x-original-host") or request.headers.get("host")
+    path = urlparse(request.headers.get("x-original-uri") or "/").path
+    service_name = request.headers.get("x-rpacm-service") or None
+
+    if await access_decisions.is_allowed(request.client.host, host, path, service_name):
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    return Response(status_code=status.HTTP_403_FORBIDDEN)
+
+
+# Loaded once; every portal request is then served from memory.
+static_assets = StaticAssets(
+    STATIC_ROOT,
+    build_hint="cd public-api/frontend && npm install && npm run build",
+    strict_prefixes=("assets",),
+).load()
+
+
+def _frontend_file_response(path_within: str, request: Request) -> Response:
+    return static_assets.response(
+        path_within,
+        accept_encoding=request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match"),
+    )
 
 
 @app.get("/", include_in_schema=False)
-async def guest_portal_index(redirect: str | None = None):
+async def guest_portal_index(request: Request, redirect: str | None = None):
     # `redirect` is the absolute URL of the protected resource that the
     # reverse proxy intercepted. The SPA reads it from window.location and
     # uses it for the "Check access" / "Continue" flow after approval.
     _ = redirect
-    return _frontend_file_response("")
+    return _frontend_file_response("", request)
 
 
 @app.get("/{full_path:path}", include_in_schema=False)
-async def guest_portal_static(full_path: str, redirect: str | None = None):
+async def guest_portal_static(full_path: str, request: Request, redirect: str | None = None):
     # See `guest_portal_index` for details on the `redirect` query parameter.
     _ = redirect
-    return _frontend_file_response(full_path)
+    return _frontend_file_response(full_path, request)
 
 
 if __name__ == "__main__":
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Several workers need the import string: each process imports the app itself.
+    uvicorn.run(
+        "app:app" if PUBLIC_API_WORKERS > 1 else app,
+        host="0.0.0.0",
+        port=8000,
+        workers=PUBLIC_API_WORKERS,
+    )